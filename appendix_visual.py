@@ -3,16 +3,32 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
-CSV_PATH = r"/Users/Ray.Fang/RSM336/out/bottom_10pct.csv"
+from momentum import OUT_DIR, LOWER_PCT, UPPER_PCT
+from snapshots import latest_snapshot, read_ranked
 
-def create_top_performers_table():
+PNG_PATH = r"/Users/Ray.Fang/RSM336/out/top_performers_table.png"
+
+# pct_rank is descending, so the winners are the low pct_rank tail
+TAILS = {"winners": [("pct_rank", "<=", LOWER_PCT)], "losers": [("pct_rank", ">", UPPER_PCT)]}
+
+def load_decile(source=None, tail="winners", n=10):
+    """
+    First n names of one decile tail in rank order, reading only the columns and
+    rows needed. `source` is a snapshot .parquet or a legacy CSV export; the
+    latest snapshot under OUT_DIR by default.
+    """
+    source = source or latest_snapshot(OUT_DIR)
+    if source is None:
+        raise FileNotFoundError(f"No ranked snapshot under {OUT_DIR}; run momentum.py first.")
+    df = read_ranked(source, columns=["ticker", "mom_12_1", "rank"], filters=TAILS[tail])
+    return df.sort_values("rank", kind="stable").head(n)
+
+def create_top_performers_table(source=None, png_path=PNG_PATH, show=True,
+                                title='Top 10 Momentum Performers\n(12-1 Month Returns)', tail="winners"):
     """Create a formatted table of top 10 performing stocks"""
     
-    # Read the data
-    df = pd.read_csv(CSV_PATH)
-    
-    # Get top 10 performers
-    top_10 = df.head(10)
+    # Read the data (top 10 performers)
+    top_10 = load_decile(source, tail)
     
     # Create figure and axis
     fig, ax = plt.subplots(figsize=(10, 8))
@@ -68,23 +84,22 @@ def create_top_performers_table():
             table[(i, j)].set_height(0.06)
     
     # Add title with Palatino font
-    plt.title('Top 10 Momentum Performers\n(12-1 Month Returns)', 
+    plt.title(title, 
               fontsize=16, fontweight='bold', pad=10, fontfamily='Palatino', color=header_color)
     
-    # Add border around the table
-    table_bbox = table.get_window_extent(fig.canvas.get_renderer())
-    
     plt.tight_layout()
     
     # Save the figure
-    plt.savefig('/Users/Ray.Fang/RSM336/out/top_performers_table.png', 
-                dpi=300, bbox_inches='tight', facecolor='white')
+    fig.savefig(png_path, dpi=300, bbox_inches='tight', facecolor='white')
+    if not show:
+        return fig
     plt.show()
     
     print("Table saved as 'top_performers_table.png' in the out folder")
     print("\nTop 10 Performers:")
     for i, (_, row) in enumerate(top_10.iterrows(), 1):
         print(f"{i:2d}. {row['ticker']:8s} {row['mom_12_1'] * 100:8.2f}%")
+    return fig
 
 if __name__ == "__main__":
     create_top_performers_table()
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+import pandas as pd
+
+from momentum import (INPUT_CSV, OUT_DIR, MIN_MONTHS, HISTORY_MONTHS, LOWER_PCT, UPPER_PCT, QUALITY_SCREEN,
+                      load_tickers, to_month_end, momentum_signal, eligible, drop_quarantined)
+from ranking import tail_masks, group_labels
+from price_cache import PriceStore
+from downloader import ChunkedDownloader
+import data_quality
+
+
+START_DATE = "2000-01-01"
+
+
+def backtest(prices_m, lookback=12, skip=1, min_months=MIN_MONTHS, window=HISTORY_MONTHS,
+             lower=LOWER_PCT, upper=UPPER_PCT, group_by=None):
+    """
+    Walk-forward long/short decile backtest over a month-end price matrix.
+
+    Every month t is ranked with the same rules as momentum.main (signal,
+    MIN_MONTHS filter over the trailing window, descending pct_rank); the long leg
+    is pct_rank <= lower, the short leg pct_rank > upper, both equal-weighted and
+    held over month t+1. With `group_by` ("exchange"/"country") the deciles are
+    taken within each group. The tails come from partial selection, so no month
+    is fully sorted; everything after that is one vectorized pass.
+
+    Returns a frame indexed by formation month with leg returns, long-short
+    return, leg sizes, per-leg hit rates and one-way turnover.
+    """
+    sig = momentum_signal(prices_m, lookback=lookback, skip=skip)
+    sig = sig.where(eligible(prices_m, window=window, min_months=min_months))
+    fwd = prices_m.pct_change(fill_method=None).shift(-1).to_numpy()
+    return tail_backtest(sig.to_numpy(), fwd, prices_m.index, lower, upper, group_labels(prices_m.columns, group_by))
+
+
+def tail_backtest(sig, fwd, index, lower=LOWER_PCT, upper=UPPER_PCT, groups=None):
+    """
+    The leg arithmetic of backtest() on a precomputed months x tickers signal
+    (NaN = not eligible) and next-month returns, for callers that build many
+    signals off one panel.
+    """
+    longs, shorts = tail_masks(sig, lower, upper, groups)
+    has_fwd = ~np.isnan(fwd)
+    fwd0 = np.where(has_fwd, fwd, 0.0)
+
+    def leg(mask):
+        held = mask & has_fwd                        # names that delist mid-month drop out of the leg
+        n = held.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ret = (fwd0 * held).sum(axis=1) / n
+            hit = ((fwd0 > 0) & held).sum(axis=1) / n
+            w = mask / mask.sum(axis=1, keepdims=True)
+        w = np.nan_to_num(w)
+        turn = 0.5 * np.abs(np.diff(w, axis=0, prepend=0.0)).sum(axis=1)
+        return ret, n, hit, turn
+
+    l_ret, l_n, l_hit, l_turn = leg(longs)
+    s_ret, s_n, s_hit, s_turn = leg(shorts)
+
+    res = pd.DataFrame({
+        "long": l_ret, "short": s_ret, "long_short": l_ret - s_ret,
+        "n_long": l_n, "n_short": s_n,
+        "long_hit": l_hit, "short_hit": 1.0 - s_hit,   # short leg "hits" when the name falls
+        "turnover_long": l_turn, "turnover_short": s_turn,
+    }, index=index)
+    res.index.name = "month"
+    return res[(res["n_long"] > 0) & (res["n_short"] > 0)]
+
+
+def summarize(res):
+    ls = res["long_short"]
+    return pd.Series({
+        "months": len(ls),
+        "mean_monthly": ls.mean(),
+        "ann_vol": ls.std() * np.sqrt(12),
+        "sharpe": ls.mean() / ls.std() * np.sqrt(12) if ls.std() > 0 else np.nan,
+        "cum_return": (1 + ls).prod() - 1,
+        "hit_rate": (ls > 0).mean(),
+        "long_hit": res["long_hit"].mean(),
+        "short_hit": res["short_hit"].mean(),
+        "turnover_long": res["turnover_long"].iloc[1:].mean(),
+        "turnover_short": res["turnover_short"].iloc[1:].mean(),
+    })
+
+
+def monthly_prices(start=START_DATE, tickers=None, quality=QUALITY_SCREEN):
+    """
+    Completed month-end closes of the universe (or `tickers`) since `start`,
+    through the cache. With `quality` the daily closes go through the same
+    screen as the live ranking first. The screen sees the whole window at
+    once, so a quarantined name is out of every month of the backtest, not
+    only the months after its bad print.
+    """
+    tickers = load_tickers(INPUT_CSV) if tickers is None else tickers
+    close = PriceStore(provider=ChunkedDownloader()).get(tickers, start)
+    close = close.loc[:, close.notna().sum() > 0]
+    if close.shape[1] == 0:
+        raise RuntimeError("No price data returned for the backtest window.")
+    if quality:
+        close = drop_quarantined(close, data_quality.scan(close))
+
+    prices_m = to_month_end(close)
+    last = close.index[-1]
+    if pd.offsets.BMonthEnd().rollforward(last) != last:     # current month is still partial
+        prices_m = prices_m.iloc[:-1]
+    return prices_m
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    res = backtest(monthly_prices())
+    res.to_csv(os.path.join(OUT_DIR, "backtest_monthly.csv"))
+    print(summarize(res).to_string())
+
+if __name__ == "__main__":
+    main()
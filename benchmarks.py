@@ -0,0 +1,157 @@
+import os, gc, json, time, argparse, platform, tracemalloc
+import numpy as np
+import pandas as pd
+
+from momentum import (sanitize, sanitize_many, to_month_end, compute_mom_12_1, momentum_signal,
+                      eligible, rank_signal, _SANITIZE_MEMO)
+from strat_analysis import sleeve_sector_returns
+from backtest import backtest
+from ranking import rank_desc, tail_masks
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+SIZES         = [2_500, 10_000, 50_000]
+YEARS         = 2          # ~ the nightly download window
+REPEAT        = 3
+TOLERANCE     = 1.25       # slower than baseline by more than this ratio = regression
+
+SECTORS = ["Energy", "Materials", "Industrials", "Consumer Discretionary", "Consumer Staples",
+           "Health Care", "Financials", "Information Technology", "Communication Services",
+           "Utilities", "Real Estate"]
+
+
+def synthetic_symbols(n, dup_rate=0.1, seed=0):
+    """Raw screener-style symbols: mixed case, spaces, share classes, CA units and foreign suffixes."""
+    rng = np.random.default_rng(seed)
+    base = np.array([f"S{i:05d}" for i in range(n)], dtype=object)
+    kind = rng.integers(0, 8, n)
+    sym = base.copy()
+    sym[kind == 1] = [s.lower() + " " for s in base[kind == 1]]
+    sym[kind == 2] = [s + ".B" for s in base[kind == 2]]
+    sym[kind == 3] = [s + ".TO" for s in base[kind == 3]]
+    sym[kind == 4] = [s + ".UN.TO" for s in base[kind == 4]]
+    sym[kind == 5] = [s + ".V" for s in base[kind == 5]]
+    sym[kind == 6] = [s + ".DE" for s in base[kind == 6]]
+    dups = rng.choice(sym, int(n * dup_rate))
+    return pd.Series(np.concatenate([sym, dups]), dtype=object)
+
+
+def synthetic_panel(n_tickers, years=YEARS, missing_rate=0.01, listing_rate=0.1, delisting_rate=0.05,
+                    seed=0, end="2025-11-14"):
+    """
+    Deterministic daily close panel (business days x tickers): GBM paths with
+    random missing days, late listings (leading NaNs) and delistings (trailing NaNs).
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=int(years * 252))
+    t, n = len(dates), n_tickers
+    vol = rng.uniform(0.01, 0.04, n).astype(np.float32)
+    steps = rng.standard_normal((t, n), dtype=np.float32) * vol + np.float32(0.0003)
+    close = np.exp(np.cumsum(steps, axis=0, dtype=np.float32)) * rng.uniform(5, 200, n).astype(np.float32)
+    close = close.astype(np.float64)
+
+    close[rng.random((t, n)) < missing_rate] = np.nan
+    rows = np.arange(t)[:, None]
+    listed = np.where(rng.random(n) < listing_rate, rng.integers(1, t, n), 0)
+    delisted = np.where(rng.random(n) < delisting_rate, rng.integers(1, t, n), t)
+    close[(rows < listed) | (rows >= delisted)] = np.nan
+    return pd.DataFrame(close, index=dates, columns=[f"S{i:05d}" for i in range(n)])
+
+
+def _measure(fn, repeat):
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return {"seconds": best, "peak_mb": peak / 2**20}
+
+
+def scenarios(n, years):
+    """(name, callable) pairs for one universe size; inputs are built once up front."""
+    close = synthetic_panel(n, years)
+    raw = synthetic_symbols(n)
+    prices_m = to_month_end(close)
+    mom = compute_mom_12_1(prices_m)
+    rng = np.random.default_rng(1)
+    sector_map = dict(zip(close.columns, rng.choice(SECTORS, n)))
+    sleeves = {f"sleeve{k}": list(rng.choice(close.columns, 50, replace=False)) for k in range(100)}
+    daily_rets = close.pct_change(fill_method=None).iloc[1:]
+    long_m = to_month_end(synthetic_panel(n, 20, seed=2)) if n <= 10_000 else None
+
+    out = [
+        ("sanitize_loop", lambda: [sanitize(x) for x in raw]),
+        ("sanitize_many", lambda: (_SANITIZE_MEMO.clear(), sanitize_many(raw))),
+        ("to_month_end", lambda: to_month_end(close)),
+        ("compute_mom_12_1", lambda: compute_mom_12_1(prices_m)),
+        ("eligible", lambda: eligible(prices_m)),
+        ("rank", lambda: rank_signal(mom.dropna())),
+        ("sector_attribution", lambda: sleeve_sector_returns(daily_rets, sleeves, sector_map)),
+    ]
+    if long_m is not None:
+        out.append(("momentum_signal_20y", lambda: momentum_signal(long_m)))
+        out.append(("backtest_20y", lambda: backtest(long_m)))
+        long_sig = momentum_signal(long_m).to_numpy()
+        out.append(("rank_20y", lambda: rank_desc(long_sig)))
+        out.append(("tails_20y", lambda: tail_masks(long_sig)))
+    return out
+
+
+def run(sizes=SIZES, years=YEARS, repeat=REPEAT, only=None):
+    results = {}
+    for n in sizes:
+        for name, fn in scenarios(n, years):
+            if only and name not in only:
+                continue
+            results[f"{name}@{n}"] = _measure(fn, repeat)
+            r = results[f"{name}@{n}"]
+            print(f"{name:>22s} @ {n:>6d}: {r['seconds'] * 1e3:10.1f} ms  peak {r['peak_mb']:8.1f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Rows of (scenario, baseline s, current s, ratio, regressed) for scenarios in both runs."""
+    rows = []
+    for key, cur in results.items():
+        if key not in baseline.get("results", {}):
+            continue
+        base = baseline["results"][key]["seconds"]
+        ratio = cur["seconds"] / base if base > 0 else np.nan
+        rows.append((key, base, cur["seconds"], ratio, ratio > tolerance))
+    return pd.DataFrame(rows, columns=["scenario", "baseline_s", "current_s", "ratio", "regressed"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline benchmarks on synthetic price panels.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--years", type=float, default=YEARS)
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--only", nargs="+", help="scenario names to run")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save", action="store_true", help="write results as the new baseline")
+    args = ap.parse_args()
+
+    results = run(args.sizes, args.years, args.repeat, args.only)
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            table = compare(results, json.load(f))
+        if not table.empty:
+            print("\n" + table.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+            if table["regressed"].any():
+                print(f"\n{int(table['regressed'].sum())} scenario(s) slower than {TOLERANCE:.2f}x baseline")
+
+    if args.save:
+        meta = {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                "machine": platform.machine(), "years": args.years, "repeat": args.repeat}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"\nSaved baseline: {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+
+BAD_TICK     = np.log(1.5)     # |log return| that, when it reverses the next day, is a bad print
+REVERSAL_TOL = 0.2             # |r_t + r_t+1| <= this * |r_t| counts as a reversal
+JUMP         = np.log(3.0)     # |log return| flagged as an outlier jump when it does not reverse
+SPLIT_RATIOS = [2, 3, 4, 5, 8, 10, 20]     # and their inverses; 3:2 is left out, earnings and deal moves hit it
+SPLIT_TOL    = 0.02            # |log(ratio / split)| within this looks like a split
+STALE_DAYS   = 10              # identical closes in a row
+GAP_DAYS     = 15              # missing trading days in a row, inside the ticker's own history
+
+# reason -> what happens to the ticker
+ACTIONS = {
+    "non_positive": "quarantine",
+    "bad_tick": "quarantine",
+    "split_like": "flag",          # closes are split-adjusted, so a ratio move that holds is usually real
+    "jump": "flag",
+    "stale": "flag",
+    "gap": "flag",
+}
+
+_LOG_SPLITS = np.log(np.array(SPLIT_RATIOS, dtype="float64"))
+
+
+def _longest_run(mask):
+    """Longest run of True down each column."""
+    c = np.cumsum(mask, axis=0)
+    reset = np.maximum.accumulate(np.where(mask, 0, c), axis=0)
+    return (c - reset).max(axis=0) if len(mask) else np.zeros(mask.shape[1], dtype=np.int64)
+
+def _first_date(mask, dates):
+    hit = mask.any(axis=0)
+    return np.where(hit, dates.values[mask.argmax(axis=0)], np.datetime64("NaT"))
+
+def scan(close):
+    """
+    One vectorized pass over a dates x tickers daily close panel. Returns a
+    frame with one row per ticker that tripped a check: counts per reason,
+    the first date of the worst event, the largest absolute daily log move,
+    the reasons and the resulting action ("quarantine" or "flag").
+
+      non_positive  a close <= 0
+      bad_tick      a move > BAD_TICK that reverses the next print
+      split_like    a move within SPLIT_TOL of a split ratio that the next print
+                    confirms (does not reverse); a move on the last day is
+                    never split_like, only a jump if large enough
+      jump          any other non-reversing move > JUMP
+
+    The move back from a bad tick is part of that event, so it is never
+    tested as split_like or jump itself.
+      stale         >= STALE_DAYS identical closes in a row
+      gap           >= GAP_DAYS missing days between the first and last close
+    """
+    p = close.to_numpy(dtype="float64")
+    t, n = p.shape
+    present = ~np.isnan(p)
+    nonpos = present & (p <= 0)
+
+    # log return of each valid close against the previous valid close (gaps and bad zeros skipped)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lp = np.log(np.where(nonpos, np.nan, p))
+    holed = np.flatnonzero(np.isnan(lp).any(axis=0))      # fills only needed where something is missing
+    lf = lp.copy()
+    lf[:, holed] = pd.DataFrame(lp[:, holed]).ffill().to_numpy()
+    r = np.full_like(lp, np.nan)
+    r[1:] = lp[1:] - lf[:-1]
+    rv = ~np.isnan(r)
+
+    # the next valid return after each one, for reversals
+    r_next = np.full_like(r, np.nan)
+    r_next[:-1] = r[1:]
+    r_next[:-1, holed] = pd.DataFrame(r[1:, holed]).bfill().to_numpy()
+
+    a = np.abs(r)
+    with np.errstate(invalid="ignore"):
+        big = a > min(BAD_TICK, JUMP, _LOG_SPLITS.min() - SPLIT_TOL)
+    bad_tick = np.zeros_like(big)
+    split_like = np.zeros_like(big)
+    jump = np.zeros_like(big)
+    bi = np.nonzero(big)                                   # only the big moves get the detailed checks
+    ab, rb, nb = a[bi], r[bi], r_next[bi]
+    with np.errstate(invalid="ignore"):
+        rev = np.abs(rb + nb) <= REVERSAL_TOL * ab
+    bad = (ab > BAD_TICK) & rev
+    # the reversing leg of a bad tick is the next big move in the same column
+    order = np.lexsort((bi[0], bi[1]))
+    same_col = bi[1][order[1:]] == bi[1][order[:-1]]
+    back = np.zeros_like(bad)
+    back[order[1:][bad[order[:-1]] & same_col]] = True
+    bad_tick[bi] = bad
+    split_like[bi] = ~rev & ~back & ~np.isnan(nb) & (np.abs(ab[:, None] - _LOG_SPLITS).min(axis=1) <= SPLIT_TOL)
+    jump[bi] = (ab > JUMP) & ~rev & ~back & ~split_like[bi]
+
+    # run-length checks only on the columns that can trip them
+    same = np.zeros_like(present)
+    same[1:] = (p[1:] == p[:-1])
+    stale = np.zeros(n, dtype=bool)
+    sc = np.flatnonzero(same.sum(axis=0) + 1 >= STALE_DAYS)
+    stale[sc] = _longest_run(same[:, sc]) + 1 >= STALE_DAYS
+
+    gap = np.zeros(n, dtype=bool)
+    gc = np.flatnonzero((~present).sum(axis=0) >= GAP_DAYS)
+    if len(gc):
+        seen = np.cumsum(present[:, gc], axis=0)
+        holes = ~present[:, gc] & (seen > 0) & (seen < seen[-1])
+        gap[gc] = _longest_run(holes) >= GAP_DAYS
+
+    counts = pd.DataFrame({
+        "non_positive": nonpos.sum(axis=0),
+        "bad_tick": bad_tick.sum(axis=0),
+        "split_like": split_like.sum(axis=0),
+        "jump": jump.sum(axis=0),
+        "stale": stale.astype(np.int64),
+        "gap": gap.astype(np.int64),
+    }, index=close.columns)
+    hit = counts.to_numpy().any(axis=1)
+    events = nonpos | bad_tick | split_like | jump
+    rep = counts[hit].copy()
+    rep["first_date"] = pd.to_datetime(_first_date(events, close.index)[hit])
+    rep["max_abs_move"] = np.where(rv.any(axis=0), np.where(rv, a, -np.inf).max(axis=0), np.nan)[hit]
+    return _label(rep)
+
+def _label(rep):
+    """Add the `reasons` and `action` columns from the per-reason counts."""
+    names = np.array(list(ACTIONS))
+    flags = rep[names].to_numpy() > 0
+    quarantine = np.array([ACTIONS[k] == "quarantine" for k in names])
+    rep["reasons"] = [",".join(names[f]) for f in flags]
+    rep["action"] = np.where((flags & quarantine).any(axis=1), "quarantine", "flag")
+    rep.index.name = "ticker"
+    return rep
+
+def combine(reports):
+    """
+    Merge scan() reports of the same tickers over different date windows:
+    counts add up, stale/gap are set if any window had them, the earliest
+    first_date and the largest move are kept.
+    """
+    reports = [r for r in reports if len(r)]
+    if not reports:
+        return _label(pd.DataFrame(columns=list(ACTIONS) + ["first_date", "max_abs_move"]))
+    if len(reports) == 1:
+        return reports[0]
+    agg = {k: "sum" for k in ACTIONS}
+    agg.update(stale="max", gap="max", first_date="min", max_abs_move="max")
+    rep = pd.concat(reports)[list(agg)].groupby(level=0, sort=True).agg(agg)
+    return _label(rep)
+
+def screen(close):
+    """scan() and drop the quarantined tickers; returns (clean close, report)."""
+    rep = scan(close)
+    bad = rep.index[rep["action"] == "quarantine"]
+    return close.drop(columns=bad), rep
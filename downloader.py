@@ -0,0 +1,170 @@
+import time, random, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from price_cache import MissingTickers, yahoo_closes
+
+
+CHUNK_SIZE   = 100     # tickers per provider call
+MAX_WORKERS  = 8
+RETRIES      = 3       # extra attempts per chunk before it is split / given up
+BACKOFF      = 1.0     # seconds, doubled each retry (plus jitter)
+MIN_INTERVAL = 0.25    # seconds between provider calls across all workers
+
+
+@dataclass
+class DownloadReport:
+    chunks: int = 0
+    calls: int = 0
+    retries: int = 0
+    failed: dict = field(default_factory=dict)    # ticker -> last error
+    empty: list = field(default_factory=list)     # fetched fine but no rows
+    seconds: float = 0.0
+
+    def merge(self, other):
+        """Combined report of two downloads (e.g. the blocks of a chunked run)."""
+        return DownloadReport(self.chunks + other.chunks, self.calls + other.calls,
+                              self.retries + other.retries, {**self.failed, **other.failed},
+                              self.empty + [t for t in other.empty if t not in self.empty],
+                              self.seconds + other.seconds)
+
+    def summary(self):
+        return (f"{self.chunks} chunks, {self.calls} calls, {self.retries} retries, "
+                f"{len(self.failed)} failed, {len(self.empty)} empty, {self.seconds:.1f}s")
+
+
+class RateLimiter:
+    """Spaces calls at least `interval` seconds apart, shared by all threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ChunkedDownloader:
+    """
+    Provider wrapper: splits the universe into chunks, fetches them on a bounded
+    thread pool with per-chunk retry/backoff and a global rate limit, and stitches
+    the wide Close frame back together. A chunk that still fails after its retries
+    is bisected so one bad symbol only costs itself. Names the provider reports
+    missing (MissingTickers: often a swallowed timeout or rate limit) get one
+    more call after a backoff; the ones still without data are `empty`.
+
+    Same signature as the providers in price_cache, so it can be handed to
+    PriceStore(provider=...), which calls it once per missing window: every
+    call's report is merged into `.report`, so it covers the whole run, and the
+    last call's alone is kept on `.last`.
+    """
+
+    def __init__(self, provider=yahoo_closes, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS,
+                 retries=RETRIES, backoff=BACKOFF, min_interval=MIN_INTERVAL):
+        self.provider = provider
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(min_interval)
+        self.report = DownloadReport()
+        self.last = DownloadReport()
+        self._lock = threading.Lock()
+
+    def _count(self, report, name):
+        with self._lock:
+            setattr(report, name, getattr(report, name) + 1)
+
+    def _call(self, chunk, start, end, report):
+        err = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count(report, "retries")
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random()))
+            self.limiter.wait()
+            self._count(report, "calls")
+            try:
+                return self.provider(chunk, start, end)
+            except MissingTickers:
+                raise
+            except Exception as e:
+                err = e
+        raise err
+
+    def _fetch_chunk(self, chunk, start, end, report, retry_missing=True):
+        try:
+            return [self._call(chunk, start, end, report)]
+        except MissingTickers as e:
+            if not retry_missing:
+                return [e.close]
+            self._count(report, "retries")
+            time.sleep(self.backoff * (1 + random.random()))
+            return [e.close] + self._fetch_chunk(e.missing, start, end, report, retry_missing=False)
+        except Exception as e:
+            if len(chunk) == 1:
+                report.failed[chunk[0]] = repr(e)
+                return []
+            mid = len(chunk) // 2
+            return (self._fetch_chunk(chunk[:mid], start, end, report, retry_missing)
+                    + self._fetch_chunk(chunk[mid:], start, end, report, retry_missing))
+
+    def __call__(self, tickers, start, end):
+        t0 = time.perf_counter()
+        tickers = list(tickers)
+        chunks = [tickers[i:i + self.chunk_size] for i in range(0, len(tickers), self.chunk_size)]
+        report = DownloadReport(chunks=len(chunks))
+
+        frames = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futs = [pool.submit(self._fetch_chunk, c, start, end, report) for c in chunks]
+            for f in as_completed(futs):
+                frames.extend(x for x in f.result() if x is not None and not x.empty)
+
+        close = pd.concat(frames, axis=1).sort_index() if frames else pd.DataFrame()
+        close = close.loc[:, ~close.columns.duplicated()]
+        got = set(close.columns[close.notna().any()]) if not close.empty else set()
+        report.empty = [t for t in tickers if t not in got and t not in report.failed]
+        report.seconds = time.perf_counter() - t0
+        self.last = report
+        self.report = self.report.merge(report)
+        return close.reindex(columns=[t for t in tickers if t in close.columns])
+
+
+class LocalProvider:
+    """
+    Stand-in provider serving closes from an in-memory frame, with injectable
+    latency and failures, for exercising the downloader without a network.
+    """
+
+    def __init__(self, close, latency=0.0, error_rate=0.0, bad=(), miss_rate=0.0, seed=0):
+        self.close = close
+        self.latency = latency
+        self.error_rate = error_rate
+        self.miss_rate = miss_rate     # per ticker: dropped from an answer like a swallowed Yahoo error
+        self.bad = set(bad)            # any chunk containing one of these always fails
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, tickers, start, end):
+        with self._lock:
+            roll = self._rng.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.error_rate or self.bad.intersection(tickers):
+            raise ConnectionError(f"injected failure for {len(tickers)} tickers")
+        cols = [t for t in tickers if t in self.close.columns]
+        rows = (self.close.index >= pd.Timestamp(start)) & (self.close.index < pd.Timestamp(end))
+        close = self.close.loc[rows, cols]
+        with self._lock:
+            dropped = [t for t in cols if self._rng.random() < self.miss_rate]
+        if dropped:
+            raise MissingTickers(dropped, close.drop(columns=dropped))
+        return close
@@ -0,0 +1,74 @@
+import sys, json, time, cProfile
+from contextlib import contextmanager
+
+try:
+    import resource                    # POSIX only
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb():
+    """Process high-water RSS in MB (None where the platform does not expose it)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def shape_of(obj):
+    shape = getattr(obj, "shape", None)
+    if shape is not None:
+        return list(shape)
+    return [len(obj)] if hasattr(obj, "__len__") else None
+
+
+class RunStats:
+    """
+    Per-stage wall time, CPU time, peak RSS and row/column counts for one run,
+    written as JSON. Only clock and getrusage reads per stage, so it is cheap
+    enough to leave on.
+    """
+
+    def __init__(self, **meta):
+        self.meta = dict(meta, started=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, data_in=None):
+        """
+        Time a block. The yielded dict takes extra fields; `out` is turned into
+        its shape, and counts such as `dropped` are recorded as given.
+        """
+        info = {"stage": name, "in": shape_of(data_in) if data_in is not None else None}
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield info
+        finally:
+            info["wall_s"] = round(time.perf_counter() - w0, 6)
+            info["cpu_s"] = round(time.process_time() - c0, 6)
+            info["peak_rss_mb"] = peak_rss_mb()
+            if "out" in info:
+                info["out"] = shape_of(info["out"])
+            self.stages.append(info)
+
+    def as_dict(self):
+        return {"meta": self.meta, "total_wall_s": round(sum(s["wall_s"] for s in self.stages), 6),
+                "stages": self.stages}
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2, default=str)
+
+
+@contextmanager
+def maybe_profile(path=None):
+    """cProfile the block and dump stats to `path`; no-op when path is None."""
+    if path is None:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(path)
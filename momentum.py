@@ -1,7 +1,15 @@
-import os, re
+import os, re, argparse
 import numpy as np
 import pandas as pd
-import yfinance as yf
+
+from price_cache import PriceStore
+from downloader import ChunkedDownloader
+from price_panel import PricePanel
+from instrument import RunStats, maybe_profile
+from ranking import rank_frame, group_labels
+from snapshots import write_snapshot
+from symbol_master import SymbolMaster
+import data_quality
 
 
 INPUT_CSV = r"C:\Users\rfang\Documents\RSM336\yf_us_can.csv"  
@@ -9,6 +17,28 @@ OUT_DIR   = r"C:\Users\rfang\Documents\RSM336\out"
 
 LOOKBACK_MONTHS = 18    
 MIN_MONTHS      = 14    
+HISTORY_MONTHS  = LOOKBACK_MONTHS + 1   # month-ends spanned by the download window; MIN_MONTHS is counted over these
+
+MEMORY_BUDGET_MB = None   # None: whole daily panel in memory; else stream it in blocks that fit
+FRAME_OVERHEAD   = 6      # copies of each daily close held while a block is read, pivoted and resampled
+
+QUALITY_SCREEN = True                   # drop tickers with bad ticks / bad closes before resampling
+QUALITY_FILE   = "data_quality.csv"     # under OUT_DIR, one row per flagged or quarantined ticker
+
+STATE_FILE   = "momentum_state.npz"       # under OUT_DIR
+STATE_PRICES = 13                    # month-end prices P[t-12..t] kept per ticker
+STATE_VALID  = HISTORY_MONTHS + 1    # presence flags; one extra month so the latest month can be replaced
+
+# pct_rank is descending (1/N = strongest), so <= LOWER_PCT holds the winners
+LOWER_PCT = 0.10
+UPPER_PCT = 0.90
+
+GROUP_BY  = None        # None ranks the whole universe; "exchange" or "country" ranks within each
+
+QUARTILES = ["Q1 (Top)", "Q2", "Q3", "Q4 (Bottom)"]
+SIGNALS   = {"Q1 (Top)": "LONG", "Q4 (Bottom)": "SHORT"}
+RANKED_FILE = "ranked_full.csv"       # under OUT_DIR, CSV export only
+EXPORT_CSV  = False                   # the Parquet snapshot under OUT_DIR/snapshots is always written
 
 CORRECTIONS = {
     # US share classes
@@ -25,83 +55,567 @@ CORRECTIONS = {
 
 ALLOWED_SUFFIXES = {"", ".TO", ".V", ".NE"} 
 
-def sanitize(t: str) -> str:
+_RE_SPACE     = re.compile(r"\s+")
+_RE_CLASS_DOT = re.compile(r"\.([A-Z])$")
+_RE_CLASS_DSH = re.compile(r"^([A-Z0-9]+)-([A-Z])$")
+_RE_CA_UNIT   = re.compile(r"^([A-Z0-9]+)\.([A-Z0-9]+)\.(TO|V|NE)$")
+_RE_SUFFIX    = re.compile(r"(\.[A-Z]{1,3})$")
+
+def _exchange_letters(allowed):
+    """Single-letter exchange suffixes (".V", ".T") that must not be read as a share class."""
+    return tuple(x for x in allowed if len(x) == 2)
+
+def sanitize(t: str, allowed=ALLOWED_SUFFIXES, corrections=CORRECTIONS) -> str:
     if not isinstance(t, str): return ""
     s = t.strip().upper()
-    s = re.sub(r"\s+", "", s)
-    s = CORRECTIONS.get(s, s)
-    s = re.sub(r"\.([A-Z])$", r"-\1", s)
-    s = re.sub(r"^([A-Z0-9]+)-([A-Z])$", r"\1\2", s)
-    s = re.sub(r"^([A-Z0-9]+)\.([A-Z0-9]+)\.(TO|V|NE)$", r"\1-\2.\3", s)
-    m = re.search(r"\.[A-Z]{1,3}$", s)
-    if m and m.group(0) not in ALLOWED_SUFFIXES:
+    s = _RE_SPACE.sub("", s)
+    s = corrections.get(s, s)
+    if not s.endswith(_exchange_letters(allowed)):
+        s = _RE_CLASS_DOT.sub(r"-\1", s)
+    s = _RE_CLASS_DSH.sub(r"\1\2", s)
+    s = _RE_CA_UNIT.sub(r"\1-\2.\3", s)
+    m = _RE_SUFFIX.search(s)
+    if m and m.group(0) not in allowed:
         return ""
     return s
 
+_SANITIZE_MEMO = {}     # (allowed, corrections) -> {raw symbol: (clean, reject reason)}; lives for the process
+
+def sanitize_many(raw, allowed=ALLOWED_SUFFIXES, corrections=CORRECTIONS):
+    """
+    Batch version of `sanitize` over a Series (or list) of raw symbols.
+    Duplicates and symbols seen by earlier calls are skipped; the rest go
+    through the same rules as vectorized .str operations. `corrections` is
+    the explicit-override step; SymbolMaster.resolve passes {} because it
+    applies its own dated overrides first.
+    Returns (clean Series aligned with `raw`, '' where rejected;
+             rejects frame with one row per distinct rejected symbol and why).
+    """
+    memo = _SANITIZE_MEMO.setdefault((frozenset(allowed), frozenset(corrections.items())), {})
+    raw = pd.Series(raw, dtype=object)
+    uniq = pd.unique(raw)
+    todo = [u for u in uniq if u not in memo]
+    if todo:
+        u = pd.Series(todo, dtype=object)
+        is_str = u.map(lambda x: isinstance(x, str)).astype(bool)
+        s = u.where(is_str, "").astype(str).str.strip().str.upper()
+        s = s.str.replace(_RE_SPACE.pattern, "", regex=True)
+        s = s.map(corrections).fillna(s) if corrections else s
+        letters = _exchange_letters(allowed)
+        keep = s.str.endswith(letters) if letters else pd.Series(False, index=s.index)
+        s = s.where(keep, s.str.replace(_RE_CLASS_DOT.pattern, r"-\1", regex=True))
+        s = s.str.replace(_RE_CLASS_DSH.pattern, r"\1\2", regex=True)
+        s = s.str.replace(_RE_CA_UNIT.pattern, r"\1-\2.\3", regex=True)
+        suf = s.str.extract(_RE_SUFFIX.pattern, expand=False)
+        bad_suf = suf.notna() & ~suf.isin(allowed)
+
+        reason = pd.Series("", index=u.index, dtype=object)
+        reason[s == ""] = "empty"
+        reason[bad_suf] = "suffix " + suf[bad_suf] + " not allowed"
+        reason[~is_str] = "not a string"
+        clean = s.where(reason == "", "")
+        memo.update(zip(todo, zip(clean, reason)))
+
+    hit = [memo[x] for x in uniq]
+    clean = raw.map(dict(zip(uniq, (c for c, _ in hit))))
+    rej = [(x, why) for x, (_, why) in zip(uniq, hit) if why]
+    return clean, pd.DataFrame(rej, columns=["symbol", "reason"])
+
 def to_month_end(df):  
+    if isinstance(df, PricePanel):
+        return df.month_end()
     return df.resample("ME").last()
 
+def momentum_signal(prices_m, lookback=12, skip=1, dates=None):
+    """
+    Closed-form (lookback - skip) momentum at each requested month-end:
+    P[t-skip] / P[t-lookback] - 1, i.e. the product of the monthly returns in
+    between. NaN unless every month-end price in [t-lookback, t-skip] is present,
+    exactly like the rolling product over pct_change() it replaces.
+    Returns a dates x tickers frame (all dates if `dates` is None).
+    """
+    p = prices_m.to_numpy()
+    if p.dtype.kind != "f":
+        p = p.astype("float64")
+    pos = np.arange(len(p)) if dates is None else prices_m.index.get_indexer(pd.DatetimeIndex(dates))
+    if (pos < 0).any():
+        raise KeyError("Requested dates are not in the monthly index.")
+
+    seen = np.zeros((len(p) + 1, p.shape[1]), dtype=np.int64)
+    np.cumsum(~np.isnan(p), axis=0, out=seen[1:])
+
+    sig = np.full((len(pos), p.shape[1]), np.nan, dtype=p.dtype)
+    ok = pos >= lookback
+    t = pos[ok]
+    need = lookback - skip + 1
+    full = (seen[t - skip + 1] - seen[t - lookback]) == need
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sig[ok] = np.where(full, p[t - skip] / p[t - lookback] - 1.0, np.nan)
+    return pd.DataFrame(sig, index=prices_m.index[pos], columns=prices_m.columns)
+
+def eligible(prices_m, window=HISTORY_MONTHS, min_months=MIN_MONTHS):
+    """True where a ticker has >= min_months month-end prices in the trailing `window` months."""
+    seen = np.zeros((len(prices_m.index) + 1, len(prices_m.columns)), dtype=np.int64)
+    np.cumsum(~np.isnan(prices_m.to_numpy()), axis=0, out=seen[1:])
+    lo = np.maximum(np.arange(1, len(seen)) - window, 0)
+    ok = (seen[1:] - seen[lo]) >= min_months
+    return pd.DataFrame(ok, index=prices_m.index, columns=prices_m.columns)
+
+def rank_signal(sig, groups=None):
+    """
+    Descending rank / pct_rank of a signal, over a Series or per row of a dates x
+    tickers frame, optionally within groups of tickers (see ranking.rank_desc).
+    """
+    return rank_frame(sig, groups)
+
+def add_ranks(out, group_by=GROUP_BY):
+    """rank / pct_rank columns on a signal frame, within `group_by` groups when set."""
+    groups = group_labels(out["ticker"], group_by)
+    if groups is not None:
+        out["group"] = groups
+    out["rank"], out["pct_rank"] = rank_signal(out["mom_12_1"], groups)
+    return out
+
+def read_universe(path=INPUT_CSV):
+    """Raw ticker column of a universe CSV."""
+    dfu = pd.read_csv(path, encoding="utf-8-sig")
+    if "ticker" not in dfu.columns:
+        dfu = dfu.rename(columns={dfu.columns[0]:"ticker"})
+    return dfu["ticker"].astype(str)
+
+def load_tickers(path=INPUT_CSV, allowed=ALLOWED_SUFFIXES, master=None):
+    """
+    Sanitized, de-duplicated ticker list from a universe CSV, resolved through
+    the symbol master (`master`, or one opened for this call) like run() does.
+    """
+    if master is None:
+        with SymbolMaster() as master:
+            return load_tickers(path, allowed, master)
+    clean, _ = master.resolve(read_universe(path), allowed, record=False)
+    return sorted(set(clean[clean != ""]))
+
 def compute_mom_12_1(prices_m):
-    rets = prices_m.pct_change()
-    ex_last = rets.shift(1)                               
-    sig = (1.0 + ex_last).rolling(11).apply(np.prod) - 1.0  
-    s = sig.iloc[-1]; s.name = "mom_12_1"
+    s = momentum_signal(prices_m, dates=prices_m.index[-1:]).iloc[0]
+    s.name = "mom_12_1"
     return s
 
-def main():
+def window_start(today=None):
+    """First day of the daily download window."""
+    days = int(LOOKBACK_MONTHS * 31)
+    return (today or pd.Timestamp.today().normalize()) - pd.Timedelta(days=days)
+
+def daily_closes(tickers, start, end=None, store=None):
+    """
+    Daily closes through the local cache and chunked downloader; returns
+    (close, download report). Pass `store` to reuse one PriceStore across
+    calls: the report is then its downloader's, covering all of them.
+    """
+    own = store is None
+    store = PriceStore(provider=ChunkedDownloader()) if own else store
+    close = store.get(tickers, start, end)
+    report = store.provider.report
+    if own and report.failed:
+        print(f"Download: {report.summary()}; failed: {', '.join(sorted(report.failed))}")
+    return close, report
+
+def _date_blocks(start, end, months):
+    """[start, end) cut at calendar month starts into windows of `months` months."""
+    cuts = pd.date_range(pd.Timestamp(start).to_period("M").to_timestamp(), end, freq=f"{months}MS")
+    edges = [pd.Timestamp(start)] + [c for c in cuts if c > pd.Timestamp(start)] + [pd.Timestamp(end)]
+    return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if a < b]
+
+def month_end_closes(tickers, start, budget_mb=MEMORY_BUDGET_MB, date_block_months=None, quality=QUALITY_SCREEN):
+    """
+    Month-end closes of `tickers` with any data since `start`, the download
+    report and the data-quality report. With no budget this is
+    to_month_end(daily_closes(...)) on the whole daily panel. With `budget_mb`
+    the daily panel is streamed in ticker blocks (and, when one ticker's full
+    history would not fit or `date_block_months` is given, month-aligned date
+    blocks) and only the month-end rows stay resident. The cache reads only
+    each block's tickers and dates, and blocks are resized as they go from the
+    bytes each cached close actually took, so a smaller budget means smaller
+    reads. Month-end .last() never looks across tickers or months, so the
+    result is identical to the in-memory path. With `quality` each daily block
+    is scanned before it is resampled and quarantined tickers are dropped;
+    with date blocks the move across a block boundary and runs spanning one
+    are not seen.
+    """
+    if budget_mb is None and date_block_months is None:
+        close, report = daily_closes(tickers, start)
+        close = close.loc[:, close.notna().sum() > 0]
+        dq = data_quality.scan(close) if quality else data_quality.combine([])
+        return to_month_end(drop_quarantined(close, dq)), report, dq
+
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    budget = (budget_mb or 1024) * 2**20
+    per_day = 8 * FRAME_OVERHEAD        # first guess per ticker-day; replaced by what the reads measure
+    if date_block_months is None and np.busday_count(start.date(), end.date()) * per_day * 10 > budget:
+        date_block_months = max(1, int(budget / (per_day * 10 * 23)))      # at least 10 tickers per block
+    windows = _date_blocks(start, end, date_block_months) if date_block_months else [(start, end)]
+    days = max(np.busday_count(a.date(), b.date()) for a, b in windows) + 1
+
+    store = PriceStore(provider=ChunkedDownloader())
+    order = sorted(tickers, key=PriceStore.bucket)      # neighbours share bucket files
+    parts, scans, i = [], [], 0
+    while i < len(order):
+        block = order[i:i + max(1, int(budget // (days * per_day)))]
+        i += len(block)
+        rows, stamps, block_scans = [], [], []
+        for a, b in windows:
+            close, _ = daily_closes(block, a, b, store)
+            n = int(close.notna().sum().sum()) if close is not None else 0
+            if n:
+                per_day = max(per_day, FRAME_OVERHEAD * max(8.0, store.read_bytes / n))
+                if quality:
+                    block_scans.append(data_quality.scan(close))
+                me = to_month_end(close)
+                rows.append(me.to_numpy())          # bare arrays: a frame per window keeps its own column index
+                stamps.append(me.index)
+            del close
+        if rows:
+            pm = pd.DataFrame(np.vstack(rows), index=stamps[0].append(stamps[1:]), columns=block)
+            dq = data_quality.combine(block_scans)
+            scans.append(dq)
+            pm = drop_quarantined(pm, dq)
+            parts.append(pm.loc[:, pm.notna().any()])
+    report = store.provider.report
+    if report.failed:
+        print(f"Download: {report.summary()}; failed: {', '.join(sorted(report.failed))}")
+    dq = data_quality.combine(scans)
+    if not parts:
+        return pd.DataFrame(), report, dq
+    pm = pd.concat(parts, axis=1)
+    cal = pd.date_range(pm.index.min(), pm.index.max(), freq="ME")
+    return pm.reindex(index=cal, columns=[t for t in tickers if t in pm.columns]), report, dq
+
+def quarantine_set(dq):
+    return set(dq.index[dq["action"] == "quarantine"])
+
+def drop_quarantined(frame, dq):
+    """`frame` without the columns the quality report quarantines."""
+    bad = quarantine_set(dq)
+    return frame.drop(columns=[c for c in frame.columns if c in bad]) if bad else frame
+
+def write_quality(dq, out_dir=None):
+    dq.to_csv(os.path.join(out_dir or OUT_DIR, QUALITY_FILE))
+    return {"flagged": int((dq["action"] == "flag").sum()), "quarantined": int((dq["action"] == "quarantine").sum())}
+
+def signal_frame(prices_m):
+    """12-1 momentum and last-month return at the last month-end, one row per ticker with a signal."""
+    mom = compute_mom_12_1(prices_m)
+    last_m = prices_m.pct_change(fill_method=None).iloc[-1].rename("ret_t_1")
+
+    out = pd.concat([mom, last_m], axis=1)
+    out.index.name = "ticker"         
+    return out.reset_index().dropna(subset=["mom_12_1"])
+
+def ranked_snapshot(prices_m, group_by=GROUP_BY):
+    """Full recompute: MIN_MONTHS filter, signal and ranks at the last month-end of `prices_m`."""
+    keep = eligible(prices_m).iloc[-1]
+    return add_ranks(signal_frame(prices_m.loc[:, keep.index[keep]]), group_by)
+
+def write_outputs(out, out_dir=None, export_csv=None):
+    """
+    Dated Parquet snapshot of the full ranking (OUT_DIR/snapshots), plus the
+    top/bottom decile and ranked_full CSVs when `export_csv` (default EXPORT_CSV).
+    Returns the two decile frames.
+    """
+    out_dir = out_dir or OUT_DIR
+    export_csv = EXPORT_CSV if export_csv is None else export_csv
+    cols = ["ticker","mom_12_1","rank","pct_rank"] + (["group"] if "group" in out else [])
+    top10 = out[out["pct_rank"] > UPPER_PCT].sort_values("rank", kind="stable")[cols]
+    bot10 = out[out["pct_rank"] <= LOWER_PCT].sort_values("rank", kind="stable")[cols]
+
+    full = add_quartiles(out.sort_values("rank", kind="stable"))
+    write_snapshot(full, out_dir)
+    if not export_csv:
+        return top10, bot10
+
+    top_path = os.path.join(out_dir, "top_10pct.csv")
+    bot_path = os.path.join(out_dir, "bottom_10pct.csv")
+    top10.to_csv(top_path, index=False)
+    bot10.to_csv(bot_path, index=False)
+
+    # swapped in atomically so readers never see a partial file
+    full_path = os.path.join(out_dir, RANKED_FILE)
+    full.to_csv(full_path + ".tmp", index=False)
+    os.replace(full_path + ".tmp", full_path)
+    return top10, bot10
+
+def add_quartiles(out):
+    q = pd.cut(out["pct_rank"], [0, 0.25, 0.5, 0.75, 1.0], labels=QUARTILES).astype(object)
+    return out.assign(quartile=q, signal=q.map(SIGNALS))
+
+# --- Rolling state for incremental month-end updates
+#
+# Per ticker we keep the last STATE_PRICES month-end prices and STATE_VALID
+# presence flags on a consecutive month-end calendar ending at state["last"].
+# That is all the 12-1 signal, ret_t_1 and the MIN_MONTHS rule need, so a new
+# month costs O(tickers) instead of a resample of the whole daily history.
+
+def build_state(prices_m, last=None):
+    """State from a month-end panel, on the calendar ending at `last` (default: its last month)."""
+    last = prices_m.index[-1] if last is None else pd.Timestamp(last)
+    tickers = sorted(prices_m.columns)
+    cal = pd.date_range(end=last, periods=STATE_VALID, freq="ME")
+    pm = prices_m.reindex(index=cal, columns=tickers).to_numpy(dtype="float64")
+    return {"last": last, "tickers": tickers,
+            "prices": pm[-STATE_PRICES:].copy(), "valid": ~np.isnan(pm)}
+
+def save_state(state, path=None):
+    path = path or os.path.join(OUT_DIR, STATE_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, last=np.datetime64(state["last"], "ns"), tickers=np.array(state["tickers"], dtype=str),
+                 prices=state["prices"], valid=state["valid"],
+                 quarantined=np.array(state.get("quarantined", []), dtype=str))
+    os.replace(tmp, path)
+
+def load_state(path=None):
+    path = path or os.path.join(OUT_DIR, STATE_FILE)
+    with np.load(path) as z:
+        return {"last": pd.Timestamp(z["last"].item()), "tickers": z["tickers"].tolist(),
+                "prices": z["prices"], "valid": z["valid"],
+                "quarantined": z["quarantined"].tolist() if "quarantined" in z.files else []}
+
+def merge_state(state, other, tickers):
+    """Restrict `state` to `tickers`, taking columns from `other` where it has them (same calendar)."""
+    if other["last"] != state["last"]:
+        raise ValueError("States are on different calendars.")
+    tickers = sorted(tickers)
+    pos = {t: i for i, t in enumerate(state["tickers"])}
+    opos = {t: i for i, t in enumerate(other["tickers"])}
+    prices = np.full((STATE_PRICES, len(tickers)), np.nan)
+    valid = np.zeros((STATE_VALID, len(tickers)), dtype=bool)
+    for src, where in ((state, pos), (other, opos)):
+        cols = [(j, where[t]) for j, t in enumerate(tickers) if t in where]
+        if cols:
+            dst, idx = map(list, zip(*cols))
+            prices[:, dst] = src["prices"][:, idx]
+            valid[:, dst] = src["valid"][:, idx]
+    return {"last": state["last"], "tickers": tickers, "prices": prices, "valid": valid}
+
+def advance_state(state, date, px):
+    """
+    Fold in month-end prices `px` (Series by ticker) for `date`. A later month
+    appends (skipped months count as missing); the same month replaces the
+    previous, possibly partial, value.
+    """
+    date = pd.Timestamp(date)
+    k = (date.to_period("M") - state["last"].to_period("M")).n
+    if k < 0:
+        raise ValueError(f"{date:%Y-%m} is before the state's last month {state['last']:%Y-%m}.")
+    prices, valid = state["prices"], state["valid"]
+    n = len(state["tickers"])
+    if k == 0:
+        prices = np.vstack([np.full((1, n), np.nan), prices[:-1]])
+        valid = np.vstack([np.zeros((1, n), dtype=bool), valid[:-1]])
+        k = 1
+    rows = np.full((k, n), np.nan)
+    rows[-1] = px.reindex(state["tickers"]).to_numpy(dtype="float64")
+    return {"last": date, "tickers": state["tickers"],
+            "prices": np.vstack([prices, rows])[-STATE_PRICES:],
+            "valid": np.vstack([valid, ~np.isnan(rows)])[-STATE_VALID:]}
+
+def state_snapshot(state, group_by=GROUP_BY):
+    """Same frame as ranked_snapshot on the full history, computed from the state alone."""
+    p, v = state["prices"], state["valid"]
+    keep = v[-HISTORY_MONTHS:].sum(axis=0) >= MIN_MONTHS
+    full = v[-13:-1].all(axis=0)                        # P[t-12] .. P[t-1] all present
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom = np.where(full, p[-2] / p[-13] - 1.0, np.nan)
+        ret = p[-1] / p[-2] - 1.0
+    out = pd.DataFrame({"ticker": state["tickers"], "mom_12_1": mom, "ret_t_1": ret})
+    out = out[keep].reset_index(drop=True).dropna(subset=["mom_12_1"])
+    return add_ranks(out, group_by)
+
+def main(profile=False, mode="full", group_by=GROUP_BY, budget_mb=MEMORY_BUDGET_MB, export_csv=EXPORT_CSV):
     os.makedirs(OUT_DIR, exist_ok=True)
+    stats = RunStats(input=INPUT_CSV, mode=mode, group_by=group_by, lookback_months=LOOKBACK_MONTHS, min_months=MIN_MONTHS)
+    prof_path = os.path.join(OUT_DIR, "momentum.prof") if profile else None
+    try:
+        with maybe_profile(prof_path):
+            if mode == "full":
+                return run(stats, group_by, budget_mb, export_csv)
+            if mode == "update":
+                return update(stats, group_by=group_by, export_csv=export_csv)
+            if mode == "verify":
+                return verify(stats, group_by)
+            raise ValueError(f"Unknown mode: {mode}")
+    finally:
+        stats.write(os.path.join(OUT_DIR, "run_stats.json"))
 
+def run(stats, group_by=GROUP_BY, budget_mb=MEMORY_BUDGET_MB, export_csv=EXPORT_CSV):
     # 1) Load + clean tickers
-    dfu = pd.read_csv(INPUT_CSV, encoding="utf-8-sig")
-    if "ticker" not in dfu.columns:
-        dfu = dfu.rename(columns={dfu.columns[0]:"ticker"})
-    tickers = [sanitize(x) for x in dfu["ticker"].astype(str).tolist()]
-    tickers = [t for t in tickers if t]               
-    tickers = sorted(set(tickers))
+    with stats.stage("load") as st:
+        raw = read_universe(INPUT_CSV)
+        st["out"] = raw
+    with stats.stage("sanitize", raw) as st, SymbolMaster() as master:
+        clean, rejects = master.resolve(raw)
+        rejects.to_csv(os.path.join(OUT_DIR, "rejected_tickers.csv"), index=False)
+        tickers = sorted(set(clean[clean != ""]))
+        live, skipped = master.split_live(tickers)
+        st.update(out=tickers, rejected=len(rejects), duplicates=int((clean != "").sum()) - len(tickers))
     if not tickers:
         raise RuntimeError("No valid US/CA tickers after sanitization.")
 
-    # 2) Download daily closes 
-    days = int(LOOKBACK_MONTHS * 31)
-    data = yf.download(
-        tickers, period=f"{days}d",
-        auto_adjust=True, progress=False,
-        group_by="column", threads=False
-    )
-    close = data["Close"] if isinstance(data, pd.DataFrame) and "Close" in data.columns else data
-    if close is None or close.empty:
-        raise RuntimeError("No price data returned. Update yfinance or check network.")
-
-    close = close.loc[:, close.notna().sum() > 0]
-    if close.shape[1] == 0:
-        raise RuntimeError("All tickers had no price history in the window.")
-
-    # 3) Monthly series 
-    prices_m = to_month_end(close)
-    keep = prices_m.count() >= MIN_MONTHS
-    prices_m = prices_m.loc[:, keep.index[keep]]
+    # 2) Daily closes (local cache, only the missing days are downloaded; known-dead symbols skipped)
+    if budget_mb is None:
+        with stats.stage("download", live) as st:
+            close, report = daily_closes(live, window_start())
+            with SymbolMaster() as master:
+                marked = master.record_download(live, close.columns[close.notna().any()], report.failed)
+            st.update(out=close, download=report.summary(), failed=len(report.failed),
+                      skipped_dead=len(skipped), marked_dead=len(marked))
+        if close is None or close.empty:
+            raise RuntimeError("No price data returned. Update yfinance or check network.")
+
+        with stats.stage("drop_empty", close) as st:
+            close = close.loc[:, close.notna().sum() > 0]
+            st["out"] = close
+            st["dropped"] = len(tickers) - close.shape[1]
+        if close.shape[1] == 0:
+            raise RuntimeError("All tickers had no price history in the window.")
+
+        with stats.stage("quality", close) as st:
+            dq = data_quality.scan(close) if QUALITY_SCREEN else data_quality.combine([])
+            close = drop_quarantined(close, dq)
+            st.update(out=close, **write_quality(dq))
+
+        # 3) Monthly series 
+        with stats.stage("resample", close) as st:
+            prices_all = to_month_end(close)
+            st["out"] = prices_all
+        del close
+    else:
+        # 2-3) streamed in blocks; only month-end rows are kept
+        with stats.stage("download_resample", live) as st:
+            prices_all, report, dq = month_end_closes(live, window_start(), budget_mb)
+            with SymbolMaster() as master:
+                marked = master.record_download(live, set(prices_all.columns) | quarantine_set(dq), report.failed)
+            st.update(out=prices_all, download=report.summary(), failed=len(report.failed),
+                      dropped=len(tickers) - prices_all.shape[1], budget_mb=budget_mb,
+                      skipped_dead=len(skipped), marked_dead=len(marked), **write_quality(dq))
+        if prices_all.shape[1] == 0:
+            raise RuntimeError("No price data returned. Update yfinance or check network.")
+
+    with stats.stage("min_months", prices_all) as st:
+        keep = eligible(prices_all).iloc[-1]
+        prices_m = prices_all.loc[:, keep.index[keep]]
+        st["out"] = prices_m
+        st["dropped"] = int((~keep).sum())
     if prices_m.shape[1] == 0:
         raise RuntimeError("No tickers have enough monthly history for 12–1.")
 
     # 4) Momentum + last-month
-    mom = compute_mom_12_1(prices_m)
-    last_m = prices_m.pct_change().iloc[-1].rename("ret_t_1")
+    with stats.stage("signal", prices_m) as st:
+        out = signal_frame(prices_m)
+        st["out"] = out
+        st["dropped"] = prices_m.shape[1] - len(out)
 
-    out = pd.concat([mom, last_m], axis=1)
-    out.index.name = "ticker"         
-    out = out.reset_index().dropna(subset=["mom_12_1"])
+    # 5) Ranking (global, or within exchange/country groups)
+    with stats.stage("rank", out) as st:
+        out = add_ranks(out, group_by)
 
-    # 5) Global ranking 
-    out["rank"] = out["mom_12_1"].rank(method="first", ascending=False)
-    out["pct_rank"] = out["mom_12_1"].rank(pct=True, ascending=False)
+    with stats.stage("write") as st:
+        top10, bot10 = write_outputs(out, export_csv=export_csv)
+        state = build_state(prices_all.reindex(columns=tickers))     # empty names too, so update does not refetch them
+        state["quarantined"] = sorted(quarantine_set(dq))
+        save_state(state)
+        st.update(top=len(top10), bottom=len(bot10))
+    return out
 
-    top10 = out[out["pct_rank"] > 0.90].sort_values("rank")[["ticker","mom_12_1","rank","pct_rank"]]
-    bot10 = out[out["pct_rank"] <= 0.10].sort_values("rank")[["ticker","mom_12_1","rank","pct_rank"]]
+def update(stats, write=True, group_by=GROUP_BY, export_csv=EXPORT_CSV):
+    """
+    Incremental run from the saved state: only the daily closes since the
+    month before the state's last month are read, and the new month-ends are
+    folded in. Tickers new to the universe, or whose overlap month-end moved
+    (restated adjusted history), are rebuilt from their full window. The new
+    days (and rebuilt histories) go through the quality screen; a quarantined
+    ticker stays out until the next full run.
+    """
+    with stats.stage("load_state") as st:
+        state = load_state()
+        quarantined = set(state["quarantined"])
+        with SymbolMaster() as master:
+            tickers = [t for t in load_tickers(INPUT_CSV, master=master) if t not in quarantined]
+            live, skipped = master.split_live(tickers)
+        st.update(out=tickers, state_tickers=len(state["tickers"]), last=str(state["last"].date()),
+                  quarantined=len(quarantined))
+    last = state["last"]
+    prev = last - pd.offsets.MonthEnd(1)
 
-    top_path = os.path.join(OUT_DIR, "top_10pct.csv")
-    bot_path = os.path.join(OUT_DIR, "bottom_10pct.csv")
-    top10.to_csv(top_path, index=False)
-    bot10.to_csv(bot_path, index=False)
+    with stats.stage("download", tickers) as st:
+        close, report = daily_closes(live, prev - pd.offsets.MonthBegin(1))
+        scans = [data_quality.scan(close)] if QUALITY_SCREEN else []
+        quarantined |= quarantine_set(scans[-1]) if scans else set()
+        tickers = [t for t in tickers if t not in quarantined]
+        fresh = to_month_end(close).reindex(columns=tickers)
+        st.update(out=fresh, download=report.summary(), failed=len(report.failed), skipped_dead=len(skipped))
+
+    with stats.stage("rebuild") as st:
+        old_prev = pd.Series(state["prices"][-2], index=state["tickers"]).reindex(tickers)
+        new_prev = fresh.loc[prev] if prev in fresh.index else pd.Series(np.nan, index=tickers)
+        same = (old_prev == new_prev) | (old_prev.isna() & new_prev.isna())
+        known = pd.Index(tickers).isin(state["tickers"])
+        rebuild = sorted(pd.Index(tickers)[~known | ~same.to_numpy()])
+        other = {"last": last, "tickers": [], "prices": None, "valid": None}
+        if rebuild:
+            hist, _ = daily_closes(rebuild, window_start())
+            if QUALITY_SCREEN:
+                scans.append(data_quality.scan(hist))
+                quarantined |= quarantine_set(scans[-1])
+                tickers = [t for t in tickers if t not in quarantined]
+            other = build_state(to_month_end(drop_quarantined(hist, scans[-1]) if scans else hist), last)
+        state = merge_state(state, other, tickers)
+        st.update(rebuilt=len(rebuild), new=int((~known).sum()), quarantined=len(quarantined))
+
+    with stats.stage("advance", fresh) as st:
+        for date, px in fresh[fresh.index >= last].iterrows():
+            state = advance_state(state, date, px)
+        out = state_snapshot(state, group_by)
+        st.update(out=out, last=str(state["last"].date()))
+
+    if write:
+        with stats.stage("write") as st:
+            top10, bot10 = write_outputs(out, export_csv=export_csv)
+            state["quarantined"] = sorted(quarantined)
+            save_state(state)
+            st.update(top=len(top10), bottom=len(bot10), **write_quality(data_quality.combine(scans)))
+    return out
+
+def verify(stats, group_by=GROUP_BY):
+    """Run the incremental update without writing and check it against a full recompute."""
+    inc = update(stats, write=False, group_by=group_by)
+    with stats.stage("full_recompute") as st:
+        close, _ = daily_closes(load_tickers(INPUT_CSV), window_start())
+        close = close.loc[:, close.notna().sum() > 0]
+        if QUALITY_SCREEN:
+            close = drop_quarantined(close, data_quality.scan(close))
+        full = ranked_snapshot(to_month_end(close), group_by)
+        st["out"] = full
+    a, b = inc.reset_index(drop=True), full.reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(a, b, check_exact=True)
+    except AssertionError as e:
+        both = a.merge(b, on="ticker", how="outer", suffixes=("_inc", "_full"), indicator=True)
+        print(f"MISMATCH: incremental {len(a)} rows vs full {len(b)} rows; "
+              f"{(both['_merge'] != 'both').sum()} tickers in only one side.\n{e}")
+        return False
+    print(f"OK: incremental update matches full recompute ({len(a)} tickers).")
+    return True
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="12-1 momentum decile screen.")
+    ap.add_argument("--profile", action="store_true", help="dump cProfile stats to OUT_DIR/momentum.prof")
+    ap.add_argument("--update", action="store_true", help="incremental month-end update from the saved state")
+    ap.add_argument("--verify", action="store_true", help="check the incremental update against a full recompute")
+    ap.add_argument("--group-by", choices=["exchange", "country"], default=GROUP_BY,
+                    help="rank within exchange (US/TSX/TSXV/NEO) or country groups instead of globally")
+    ap.add_argument("--memory-budget", type=float, default=MEMORY_BUDGET_MB, metavar="MB",
+                    help="stream the daily panel in blocks that fit this budget instead of loading it whole")
+    ap.add_argument("--csv", action="store_true", default=EXPORT_CSV,
+                    help="also export top_10pct / bottom_10pct / ranked_full CSVs")
+    args = ap.parse_args()
+    main(profile=args.profile, group_by=args.group_by, budget_mb=args.memory_budget, export_csv=args.csv, mode="verify" if args.verify else "update" if args.update else "full")
@@ -0,0 +1,159 @@
+import os, re, shutil, argparse, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from momentum import (INPUT_CSV, OUT_DIR, ALLOWED_SUFFIXES, GROUP_BY, EXPORT_CSV, QUALITY_SCREEN, read_universe,
+                      daily_closes, window_start, to_month_end, ranked_snapshot, write_outputs, drop_quarantined,
+                      write_quality)
+from price_panel import PricePanel
+from instrument import RunStats
+from symbol_master import SymbolMaster
+import data_quality
+
+
+MAX_WORKERS = os.cpu_count() or 2
+SHM_ROOT    = "/dev/shm" if os.path.isdir("/dev/shm") else None     # RAM-backed where the OS has one
+
+
+@dataclass
+class Universe:
+    name: str                          # also the output sub-directory under OUT_DIR
+    csv: str = None                    # universe CSV (first column or `ticker`) ...
+    tickers: list = None               # ... or an explicit symbol list
+    suffixes: set = field(default_factory=lambda: set(ALLOWED_SUFFIXES))
+    group_by: str = GROUP_BY
+
+    def raw(self):
+        return read_universe(self.csv) if self.csv else pd.Series(self.tickers, dtype=object)
+
+
+def default_universes():
+    """US/Canada from INPUT_CSV plus the Tokyo and European names of the strat_analysis sleeves."""
+    from strat_analysis import VALUE_TICKERS, MOM_TICKERS
+    sleeves = VALUE_TICKERS + MOM_TICKERS
+    return [
+        Universe("us_can", csv=INPUT_CSV),
+        Universe("tokyo", tickers=[t for t in sleeves if t.endswith(".T")], suffixes={".T"}),
+        Universe("europe", tickers=[t for t in sleeves if t.endswith((".DE", ".PA", ".AS", ".L"))],
+                 suffixes={".DE", ".PA", ".AS", ".L"}),
+    ]
+
+
+# --- worker side: the month-end panel is memory-mapped once per process
+
+_PANEL = None
+
+def _attach(root):
+    global _PANEL
+    _PANEL = PricePanel.load(root, mmap=True)
+
+def _screen(name, tickers, group_by, out_dir, export_csv=EXPORT_CSV):
+    """Signal, ranking and outputs for one universe, on its columns of the shared panel."""
+    tickers = [t for t in tickers if t in _PANEL.ticker_index]
+    prices_m = pd.DataFrame(_PANEL.take(tickers), index=_PANEL.dates, columns=tickers)
+    prices_m = prices_m.loc[:, prices_m.notna().any()]
+    os.makedirs(out_dir, exist_ok=True)
+    if prices_m.shape[1] == 0:
+        return {"universe": name, "priced": 0, "ranked": 0, "top": 0, "bottom": 0}
+    out = ranked_snapshot(prices_m, group_by)
+    top10, bot10 = write_outputs(out, out_dir, export_csv)
+    return {"universe": name, "priced": prices_m.shape[1], "ranked": len(out),
+            "top": len(top10), "bottom": len(bot10)}
+
+
+def run(universes, max_workers=MAX_WORKERS, out_root=None, stats=None, export_csv=EXPORT_CSV):
+    """
+    Screen several universes off one download and one resample. The union
+    of all universes, resolved through the symbol master, is fetched (cache +
+    chunked downloader), put through the same data-quality screen as
+    momentum.run (report in OUT_DIR/data_quality.csv) and turned into a
+    float64 month-end PricePanel once; that panel is written to a RAM-backed
+    temp dir and memory-mapped by every worker, so the processes share one
+    copy of the matrix. Each worker then ranks one universe exactly as
+    momentum.run would and writes its snapshot (and CSVs) to OUT_DIR/<name>/.
+    """
+    out_root = out_root or OUT_DIR
+    stats = stats or RunStats(mode="multi")
+
+    with stats.stage("sanitize") as st, SymbolMaster() as master:
+        members = {}
+        for u in universes:
+            clean, rejects = master.resolve(u.raw(), u.suffixes)
+            members[u.name] = sorted(set(clean[clean != ""]))
+            os.makedirs(os.path.join(out_root, u.name), exist_ok=True)
+            rejects.to_csv(os.path.join(out_root, u.name, "rejected_tickers.csv"), index=False)
+        union = sorted(set().union(*members.values()))
+        st.update(out=union, per_universe={k: len(v) for k, v in members.items()},
+                  shared=sum(map(len, members.values())) - len(union))
+    if not union:
+        raise RuntimeError("No valid tickers in any universe after sanitization.")
+
+    with stats.stage("download", union) as st:
+        close, report = daily_closes(union, window_start())
+        st.update(out=close, download=report.summary(), failed=len(report.failed))
+    with stats.stage("quality", close) as st:
+        close = close.loc[:, close.notna().any()]
+        dq = data_quality.scan(close) if QUALITY_SCREEN else data_quality.combine([])
+        close = drop_quarantined(close, dq)
+        st.update(out=close, **write_quality(dq, out_root))
+    with stats.stage("resample", close) as st:
+        panel = PricePanel.from_frame(to_month_end(close), dtype=np.float64)
+        st["out"] = panel
+
+    root = tempfile.mkdtemp(prefix="momentum_panel_", dir=SHM_ROOT)
+    try:
+        panel.save(root)
+        del panel
+        with stats.stage("screen") as st:
+            jobs = [(u.name, members[u.name], u.group_by, os.path.join(out_root, u.name), export_csv)
+                    for u in universes]
+            if max_workers <= 1:
+                _attach(root)
+                results = [_screen(*j) for j in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)),
+                                         initializer=_attach, initargs=(root,)) as pool:
+                    results = list(pool.map(_screen, *zip(*jobs)))
+            st["universes"] = results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return pd.DataFrame(results).set_index("universe")
+
+
+_RE_SUFFIXES = re.compile(r"^(\.[A-Za-z]{1,3})?(,(\.[A-Za-z]{1,3})?)*$")
+
+def _parse_universe(spec):
+    """
+    NAME=PATH.csv[:SUFFIXES], SUFFIXES comma-separated with "" for no suffix,
+    e.g. us=u.csv:,.TO. The last colon splits, and only when what follows it is
+    a suffix list, so Windows paths (C:\\...\\u.csv) keep their drive letter.
+    """
+    name, _, rest = spec.partition("=")
+    path, sep, suffixes = rest.rpartition(":")
+    if not sep or not _RE_SUFFIXES.match(suffixes):
+        path, suffixes = rest, ""
+    if not name or not path:
+        raise argparse.ArgumentTypeError(f"Expected NAME=PATH[:SUFFIXES], got {spec!r}")
+    return Universe(name, csv=path, suffixes=set(suffixes.split(",")) if suffixes else set(ALLOWED_SUFFIXES))
+
+def main():
+    ap = argparse.ArgumentParser(description="12-1 momentum screens for several universes off one price panel.")
+    ap.add_argument("--universe", type=_parse_universe, action="append",
+                    help="NAME=PATH.csv[:SUFFIXES]; repeatable (default: us_can, tokyo, europe)")
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS)
+    ap.add_argument("--csv", action="store_true", default=EXPORT_CSV, help="also export the CSVs per universe")
+    args = ap.parse_args()
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    stats = RunStats(mode="multi")
+    try:
+        res = run(args.universe or default_universes(), args.workers, stats=stats, export_csv=args.csv)
+    finally:
+        stats.write(os.path.join(OUT_DIR, "run_stats_multi.json"))
+    print(res.to_string())
+
+if __name__ == "__main__":
+    main()
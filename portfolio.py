@@ -0,0 +1,336 @@
+import os, argparse, warnings
+import numpy as np
+import pandas as pd
+
+from momentum import (OUT_DIR, LOWER_PCT, UPPER_PCT, MIN_MONTHS, HISTORY_MONTHS, window_start, daily_closes,
+                      momentum_signal, eligible)
+from ranking import tail_masks, group_labels
+from snapshots import latest_snapshot, read_ranked
+
+
+SCHEMES      = ("equal", "inverse_vol", "risk_parity")
+SCHEME       = "inverse_vol"
+VOL_WINDOW   = 63        # trading days of returns behind the vol / covariance estimates
+TARGET_VOL   = 0.10      # annualised ex-ante vol per leg; None keeps each leg at gross 1
+MAX_LEVERAGE = 2.0       # cap on the vol-scaling multiplier
+MAX_WEIGHT   = 0.05      # per name, as a share of its leg; None for no cap
+SECTOR_CAP   = 0.30      # per sector, as a share of its leg; None for no cap
+UNCAPPED     = {"Unknown"}   # sector labels the cap does not apply to: names off the map are not one sector
+MAX_TURNOVER = None      # one-way turnover per rebalance, as a share of gross; None trades straight to target
+SHRINK       = 0.5       # risk parity: covariance shrunk this far toward its diagonal
+RP_ITER      = 200
+RP_TOL       = 1e-10
+PORTFOLIO_DIR = "portfolio"      # under OUT_DIR, dated weight files next to the snapshots'
+
+
+def _default_sector_map():
+    from strat_analysis import SECTOR_MAP
+    return SECTOR_MAP
+
+
+# --- row-wise building blocks: every array is rows (formation dates) x names
+
+def _window_vol(rets, ends, window=VOL_WINDOW):
+    """
+    Daily return std over the `window` days ending at each row index in `ends`,
+    from running sums, so any number of dates cost one pass over the panel.
+    NaN where a name has fewer than window // 2 returns in the window.
+    """
+    valid = ~np.isnan(rets)
+    x = np.where(valid, rets, 0.0)
+    c = np.zeros((3, len(x) + 1, x.shape[1]))
+    np.cumsum(valid, axis=0, out=c[0, 1:])
+    np.cumsum(x, axis=0, out=c[1, 1:])
+    np.cumsum(x * x, axis=0, out=c[2, 1:])
+    hi = np.asarray(ends) + 1
+    lo = np.maximum(hi - window, 0)
+    n, s, ss = c[:, hi] - c[:, lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (ss - s * s / n) / (n - 1)
+    return np.where(n >= max(window // 2, 2), np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+def _normalise(w):
+    total = w.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, w / total, 0.0)
+
+def inverse_vol(mask, vol):
+    """1 / vol over the masked names of each row, summing to 1; names without a vol get the row's median."""
+    v = np.where(mask & (vol > 0), vol, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)         # rows with no masked names
+        med = np.nanmedian(v, axis=1, keepdims=True)
+    v = np.where(mask & np.isnan(v), med, v)
+    return _normalise(np.where(mask & (v > 0), 1.0 / v, 0.0))
+
+def risk_parity(x, shrink=SHRINK, iters=RP_ITER, tol=RP_TOL):
+    """
+    Equal-risk-contribution weights for the columns of a days x names return
+    window. The covariance is never formed: S w = X'(X w) / (m - 1) on the
+    demeaned window, shrunk toward its diagonal, so one iteration is O(days x
+    names). Fixed point of w <- sqrt(w / S w), normalised, which holds exactly
+    when every w_i (S w)_i is equal. Starts from inverse vol. Keep `shrink`
+    above 0 when the window has fewer days than names: the sample covariance
+    is singular then and the weights collapse.
+    """
+    x = x - np.nanmean(x, axis=0)
+    x = np.nan_to_num(x)
+    m = max(len(x) - 1, 1)
+    d = (x * x).sum(axis=0) / m
+    pos = d > 0
+    d = np.where(pos, d, np.median(d[pos]) if pos.any() else 1.0)
+    w = 1.0 / np.sqrt(d)
+    w /= w.sum()
+    for _ in range(iters):
+        sw = (1.0 - shrink) * (x.T @ (x @ w)) / m + shrink * d * w
+        new = np.sqrt(w / np.maximum(sw, 1e-300))
+        new /= new.sum()
+        done = np.abs(new - w).max() < tol
+        w = new
+        if done:
+            break
+    return w
+
+def _level(w, limit, target):
+    """
+    Per row, the scale t with sum(min(limit, t * w)) == target, for non-negative
+    w and per-name limits (inf for none): the sum is piecewise linear in t with
+    a kink where each name hits its limit, so sorting the kinks gives t
+    exactly. inf where the limits add up to less than the target.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        kink = np.where(w > 0, limit / w, np.inf)
+    order = np.argsort(kink, axis=1)
+    k, ws, ls = (np.take_along_axis(a, order, axis=1) for a in (kink, w, limit))
+    at_limit = np.where(np.isfinite(k), ls, 0.0)
+    capped = np.cumsum(at_limit, axis=1) - at_limit           # names before each kink sit at their limit
+    free = np.cumsum(ws[:, ::-1], axis=1)[:, ::-1]           # weight of the names not yet at their limit
+    with np.errstate(invalid="ignore"):
+        reach = np.where(np.isfinite(k), capped + k * free, np.inf)
+    ok = (ws > 0) & (reach >= target)
+    j = ok.argmax(axis=1)[:, None]
+    rows = np.arange(len(w))[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (target - capped[rows, j]) / free[rows, j]
+    return np.where(ok.any(axis=1, keepdims=True), np.maximum(t, 0.0), np.inf)
+
+def _scaled(w, t, limit):
+    with np.errstate(invalid="ignore"):
+        return np.where(w > 0, np.minimum(limit, t * w), 0.0)
+
+def apply_caps(w, max_weight=MAX_WEIGHT, sectors=None, sector_cap=SECTOR_CAP, exempt=UNCAPPED):
+    """
+    Cap each name at `max_weight` and each sector at `sector_cap` of every
+    row's gross (rows of non-negative leg weights), handing the excess to
+    the names below their caps pro rata: every name ends at min(its cap,
+    t x its weight), with one t per row and a lower one per capped sector.
+    Sectors in `exempt` are never capped. A row whose caps add up to less
+    than its gross keeps the remainder uninvested, with a warning.
+    """
+    w = np.array(w, dtype="float64")
+    by_sector = sectors is not None and sector_cap is not None
+    if w.size == 0 or (max_weight is None and not by_sector):
+        return w
+    gross = w.sum(axis=1, keepdims=True)
+    limit = np.full(w.shape, np.inf) if max_weight is None else np.repeat(max_weight * gross, w.shape[1], axis=1)
+    if by_sector:
+        codes, uniques = pd.factorize(np.asarray(sectors, dtype=object), use_na_sentinel=False)
+        for g, name in enumerate(uniques):
+            if name in exempt:
+                continue
+            cols = np.flatnonzero(codes == g)
+            sub, cap = w[:, cols], limit[:, cols]
+            limit[:, cols] = _scaled(sub, _level(sub, cap, sector_cap * gross), cap)
+    w = _scaled(w, _level(w, limit, gross), limit)
+    short = w.sum(axis=1) < gross[:, 0] * (1 - 1e-9)
+    if short.any():
+        held = (w.sum(axis=1)[short] / gross[short, 0]).min()
+        warnings.warn(f"caps hold only {held:.0%} of the gross on {short.sum()} of {len(w)} rows; "
+                      f"the rest is left uninvested (loosen max_weight / sector_cap or widen the sector map)",
+                      RuntimeWarning, stacklevel=2)
+    return w
+
+def limit_turnover(target, prev, max_turnover=MAX_TURNOVER):
+    """Trade from `prev` toward `target` only as far as `max_turnover` (one-way) allows."""
+    if max_turnover is None or prev is None:
+        return target
+    turn = 0.5 * np.abs(target - prev).sum()
+    if turn <= max_turnover:
+        return target
+    return prev + (target - prev) * (max_turnover / turn)
+
+
+# --- construction
+
+def build_weights(longs, shorts, rets, ends, sectors=None, prev=None, scheme=SCHEME, target_vol=TARGET_VOL,
+                  max_weight=MAX_WEIGHT, sector_cap=SECTOR_CAP, max_turnover=MAX_TURNOVER, window=VOL_WINDOW):
+    """
+    Signed weights for rows x names leg masks, each row formed at daily row
+    ends[i] of `rets` (days x names daily returns, ndarray). Per leg: equal,
+    inverse-vol or risk-parity weights, then name and sector caps, then the
+    leg is scaled to `target_vol` on its trailing window (at most
+    MAX_LEVERAGE). Longs sum to +scale, shorts to -scale. With `max_turnover`
+    each row is moved from the previous one (`prev` for the first) only as far
+    as the limit allows. Everything up to the caps is one vectorized pass over
+    all rows; risk parity, vol scaling and the turnover chain loop over rows on
+    O(window x names) work each.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown scheme: {scheme} (expected one of {SCHEMES})")
+    longs, shorts = np.asarray(longs, dtype=bool), np.asarray(shorts, dtype=bool)
+    rets = np.asarray(rets, dtype="float64")
+    ends = np.asarray(ends)
+    vol = _window_vol(rets, ends, window) if scheme != "equal" else None
+
+    legs = []
+    for mask in (longs, shorts):
+        w = inverse_vol(mask, vol) if scheme != "equal" else _normalise(mask.astype("float64"))
+        if scheme == "risk_parity":
+            for i, e in enumerate(ends):
+                cols = np.flatnonzero(mask[i])
+                if len(cols) > 1:
+                    w[i] = 0.0
+                    w[i, cols] = risk_parity(rets[max(e + 1 - window, 0):e + 1, cols])
+        w = apply_caps(w, max_weight, sectors, sector_cap)
+        if target_vol is not None:
+            for i, e in enumerate(ends):
+                cols = np.flatnonzero(w[i])
+                if len(cols) == 0:
+                    continue
+                pnl = np.nan_to_num(rets[max(e + 1 - window, 0):e + 1, cols]) @ w[i, cols]
+                ann = pnl.std(ddof=1) * np.sqrt(252) if len(pnl) > 1 else np.nan
+                w[i] *= min(target_vol / ann, MAX_LEVERAGE) if ann > 0 else 1.0
+        legs.append(w)
+    target = legs[0] - legs[1]
+
+    if max_turnover is None:
+        return target
+    out = np.empty_like(target)
+    last = None if prev is None else np.asarray(prev, dtype="float64")
+    for i in range(len(target)):
+        last = out[i] = limit_turnover(target[i], last, max_turnover)
+    return out
+
+def construct(ranked, rets, prev=None, lower=LOWER_PCT, upper=UPPER_PCT, sector_map=None, **kw):
+    """
+    Weights for one ranked snapshot: longs are pct_rank <= lower (the winners),
+    shorts pct_rank > upper. `rets` is a days x tickers frame of daily returns
+    ending at the snapshot; `prev` an optional Series of the previous weights
+    for the turnover limit. Returns ticker, side, sector, vol and weight.
+    """
+    tickers = list(ranked["ticker"])
+    if prev is not None:                                # names held before but no longer ranked are sold down too
+        seen = set(tickers)
+        tickers += [t for t in prev.index[prev != 0] if t not in seen]
+    pct = ranked.set_index("ticker")["pct_rank"].reindex(tickers).to_numpy(dtype="float64")
+    sector_map = _default_sector_map() if sector_map is None else sector_map
+    sectors = group_labels(tickers, "sector", sector_map)
+    r = rets.reindex(columns=tickers).to_numpy(dtype="float64")
+    if prev is not None:
+        prev = prev.reindex(tickers).fillna(0.0).to_numpy()
+    w = build_weights((pct <= lower)[None], (pct > upper)[None], r, [len(r) - 1], sectors, prev, **kw)[0]
+    out = pd.DataFrame({"ticker": tickers, "side": np.where(w > 0, "LONG", np.where(w < 0, "SHORT", "")),
+                        "sector": sectors, "vol": _window_vol(r, [len(r) - 1])[0] * np.sqrt(252), "weight": w})
+    return out[w != 0].sort_values("weight", ascending=False, kind="stable").reset_index(drop=True)
+
+def history_weights(prices_m, daily_rets, lookback=12, skip=1, min_months=MIN_MONTHS, window=HISTORY_MONTHS,
+                    lower=LOWER_PCT, upper=UPPER_PCT, group_by=None, sector_map=None, **kw):
+    """
+    Batch mode: signed weights for every month of `prices_m`, with the same
+    ranking rules as backtest.backtest and the vol estimates taken from
+    `daily_rets` up to each month-end, in one build_weights call. Returns a
+    months x tickers frame (all zero where a month has no tails).
+    """
+    sig = momentum_signal(prices_m, lookback=lookback, skip=skip)
+    sig = sig.where(eligible(prices_m, window=window, min_months=min_months))
+    longs, shorts = tail_masks(sig.to_numpy(), lower, upper, group_labels(prices_m.columns, group_by))
+    daily = daily_rets.reindex(columns=prices_m.columns)
+    ends = daily.index.searchsorted(prices_m.index, side="right") - 1
+    ok = ends >= 0
+    sector_map = _default_sector_map() if sector_map is None else sector_map
+    sectors = group_labels(prices_m.columns, "sector", sector_map)
+    w = np.zeros(prices_m.shape)
+    w[ok] = build_weights(longs[ok], shorts[ok], daily.to_numpy(dtype="float64"), ends[ok], sectors, **kw)
+    return pd.DataFrame(w, index=prices_m.index, columns=prices_m.columns)
+
+def weighted_backtest(prices_m, weights):
+    """
+    Month-by-month returns of signed weights formed at each month-end and held
+    over the next month, with the columns of backtest.backtest, so
+    backtest.summarize applies. Names without a next-month price drop out of
+    their leg and its weight goes to the names still held, pro rata, at the
+    leg's gross; with equal weights this is backtest.tail_backtest exactly.
+    """
+    w = weights.reindex(index=prices_m.index, columns=prices_m.columns).fillna(0.0).to_numpy()
+    fwd = prices_m.pct_change(fill_method=None).shift(-1).to_numpy()
+    has_fwd = ~np.isnan(fwd)
+    fwd = np.where(has_fwd, fwd, 0.0)
+    lw, sw = np.maximum(w, 0.0), np.maximum(-w, 0.0)
+    lh, sh = (lw > 0) & has_fwd, (sw > 0) & has_fwd
+    with np.errstate(invalid="ignore", divide="ignore"):
+        l_hit = ((fwd > 0) & lh).sum(axis=1) / lh.sum(axis=1)
+        s_hit = 1.0 - ((fwd > 0) & sh).sum(axis=1) / sh.sum(axis=1)
+        l_ret = (fwd * lw).sum(axis=1) / (lw * lh).sum(axis=1) * lw.sum(axis=1)
+        s_ret = (fwd * sw).sum(axis=1) / (sw * sh).sum(axis=1) * sw.sum(axis=1)
+    res = pd.DataFrame({
+        "long": l_ret, "short": s_ret, "long_short": l_ret - s_ret,
+        "n_long": lh.sum(axis=1), "n_short": sh.sum(axis=1),
+        "gross_long": lw.sum(axis=1), "gross_short": sw.sum(axis=1),
+        "long_hit": l_hit, "short_hit": s_hit,
+        "turnover_long": 0.5 * np.abs(np.diff(lw, axis=0, prepend=0.0)).sum(axis=1),
+        "turnover_short": 0.5 * np.abs(np.diff(sw, axis=0, prepend=0.0)).sum(axis=1),
+    }, index=prices_m.index)
+    res.index.name = "month"
+    return res[(res["n_long"] > 0) & (res["n_short"] > 0)]
+
+
+# --- dated weight files
+
+def weights_path(out_dir, date):
+    return os.path.join(out_dir, PORTFOLIO_DIR, f"weights_{pd.Timestamp(date):%Y-%m-%d}.parquet")
+
+def previous_weights(out_dir, before):
+    """Weights of the newest file dated before `before`, as a Series by ticker (None if there is none)."""
+    root = os.path.join(out_dir, PORTFOLIO_DIR)
+    if not os.path.isdir(root):
+        return None
+    cut = f"weights_{pd.Timestamp(before):%Y-%m-%d}.parquet"
+    files = sorted(f for f in os.listdir(root) if f.startswith("weights_") and f.endswith(".parquet") and f < cut)
+    if not files:
+        return None
+    return pd.read_parquet(os.path.join(root, files[-1]), columns=["ticker", "weight"]).set_index("ticker")["weight"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Risk-scaled long/short weights for the latest ranked snapshot.")
+    ap.add_argument("--snapshot", default=None, help="snapshot .parquet or CSV export (default: newest under OUT_DIR)")
+    ap.add_argument("--scheme", choices=SCHEMES, default=SCHEME)
+    ap.add_argument("--target-vol", type=float, default=TARGET_VOL, help="annualised vol per leg (0 to disable)")
+    ap.add_argument("--max-weight", type=float, default=MAX_WEIGHT)
+    ap.add_argument("--sector-cap", type=float, default=SECTOR_CAP)
+    ap.add_argument("--max-turnover", type=float, default=MAX_TURNOVER,
+                    help="one-way turnover limit against the previous weights file")
+    args = ap.parse_args()
+
+    path = args.snapshot or latest_snapshot(OUT_DIR)
+    if path is None:
+        raise RuntimeError(f"No ranked snapshot under {OUT_DIR}; run momentum.py first.")
+    ranked = read_ranked(path, ["ticker", "pct_rank"])
+    tails = ranked[(ranked["pct_rank"] <= LOWER_PCT) | (ranked["pct_rank"] > UPPER_PCT)]
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=2 * VOL_WINDOW)
+    close, _ = daily_closes(list(tails["ticker"]), max(start, window_start()))
+    rets = close.pct_change(fill_method=None).iloc[1:]
+
+    today = pd.Timestamp.today()
+    prev = previous_weights(OUT_DIR, today) if args.max_turnover is not None else None
+    w = construct(tails, rets, prev, scheme=args.scheme, target_vol=args.target_vol or None,
+                  max_weight=args.max_weight, sector_cap=args.sector_cap, max_turnover=args.max_turnover)
+    out = weights_path(OUT_DIR, today)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    w.to_parquet(out + ".tmp", index=False)
+    os.replace(out + ".tmp", out)
+    g = w.groupby("side")["weight"].agg(["size", "sum"])
+    print(f"Wrote {out}\n{g.to_string()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
-import yfinance as yf
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import datetime as dt
 
+from price_cache import PriceStore
+
 # --- Settings ---
 TICKER = "EFR.TO"
 START_DATE = "2025-01-01"
@@ -11,19 +12,20 @@ SPLIT_DATE = dt.datetime(2025, 10, 7)   # split date
 
 # --- Fetch data ---
 def fetch_stock_data(ticker, start_date, end_date):
-    return yf.download(ticker, start=start_date, end=end_date)
+    close = PriceStore().get([ticker], start_date, end_date)[ticker].dropna()
+    return close.to_frame(name="Close")
 
 # --- Plot ---
-def plot_stock_data(stock_data, ticker):
-    plt.figure(figsize=(14, 7))
+def plot_stock_data(stock_data, ticker, split_date=SPLIT_DATE, path=None, show=True):
+    fig = plt.figure(figsize=(14, 7))
 
     # Apply font style
     plt.rcParams['font.family'] = 'Palatino'
     plt.rcParams['font.size'] = 14
 
     # Split data
-    before = stock_data.loc[stock_data.index <= SPLIT_DATE]
-    after = stock_data.loc[stock_data.index >= SPLIT_DATE]
+    before = stock_data.loc[stock_data.index <= split_date]
+    after = stock_data.loc[stock_data.index >= split_date]
 
     # Plot before period (blue-ish)
     plt.plot(
@@ -43,9 +45,9 @@ def plot_stock_data(stock_data, ticker):
     )
 
     # Annotation line at the split date
-    plt.axvline(SPLIT_DATE, color='grey', linestyle='--', linewidth=1)
+    plt.axvline(split_date, color='grey', linestyle='--', linewidth=1)
     plt.text(
-        SPLIT_DATE, 
+        split_date, 
         stock_data['Close'].max()*0.97, 
         "Entry Date", 
         fontsize=13,
@@ -66,7 +68,11 @@ def plot_stock_data(stock_data, ticker):
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
 
-    plt.show()
+    if path:
+        fig.savefig(path, dpi=150, bbox_inches='tight', facecolor='white')
+    if show:
+        plt.show()
+    return fig
 
 # --- Run ---
 if __name__ == "__main__":
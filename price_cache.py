@@ -0,0 +1,267 @@
+import os, json, zlib
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+RESTATE_RTOL   = 1e-4     # adjusted closes that move more than this on the overlap day get refetched
+BUCKETS        = 64       # tickers are hashed into this many Parquet files
+ROW_GROUP_ROWS = 16_384   # rows per Parquet row group, date-major: a date-window read skips the others
+OVERLAP_DAYS   = 10       # read this far before a cached end so the restatement check finds the last row
+
+
+class MissingTickers(Exception):
+    """
+    A provider call came back without data for some of the requested tickers.
+    `close` holds the ones that did come back, `missing` the rest.
+    """
+
+    def __init__(self, missing, close):
+        super().__init__(f"no data for {len(missing)} ticker(s): {', '.join(missing[:5])}"
+                         + (", ..." if len(missing) > 5 else ""))
+        self.missing = list(missing)
+        self.close = close
+
+
+def yahoo_closes(tickers, start, end):
+    """
+    Default provider: auto-adjusted daily closes from Yahoo, one column per
+    ticker. yf.download swallows per-ticker errors (timeouts, rate limits)
+    and hands back an empty column, so requested tickers without data raise
+    MissingTickers, carrying the closes that did arrive.
+    """
+    tickers = list(tickers)
+    data = yf.download(
+        tickers, start=start, end=end,
+        auto_adjust=True, progress=False,
+        group_by="column", threads=False
+    )
+    if data is None or data.empty:
+        raise MissingTickers(tickers, pd.DataFrame())
+    close = data["Close"] if "Close" in data.columns else data
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=tickers[0])
+    close.index = pd.DatetimeIndex(close.index).tz_localize(None)
+    missing = [t for t in tickers if t not in close.columns or close[t].isna().all()]
+    if missing:
+        raise MissingTickers(missing, close.drop(columns=[t for t in missing if t in close.columns]))
+    return close
+
+
+class PriceStore:
+    """
+    On-disk daily close cache: long (ticker, date, close) Parquet files, with
+    tickers hashed into BUCKETS files, plus an index of the date range already
+    fetched per ticker. `get` only asks the provider for the missing part of
+    the requested window, merges it in and rewrites the buckets it touched.
+
+    provider(tickers, start, end) -> DataFrame (date index, one column per ticker),
+    `end` exclusive like yf.download.
+    """
+
+    def __init__(self, root=CACHE_DIR, provider=yahoo_closes):
+        self.root = root
+        self.provider = provider
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        self._index = self._load_index()
+        self.read_bytes = 0      # in-memory size of the cached rows the last `get` read
+
+    # --- storage
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return {}
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return {t: (pd.Timestamp(s), pd.Timestamp(e)) for t, (s, e) in raw.items()}
+
+    def _save_index(self):
+        raw = {t: [s.strftime("%Y-%m-%d"), e.strftime("%Y-%m-%d")] for t, (s, e) in self._index.items()}
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        os.replace(tmp, self._index_path)
+
+    @staticmethod
+    def bucket(ticker):
+        return zlib.crc32(ticker.encode("utf-8")) % BUCKETS
+
+    def _path(self, b):
+        return os.path.join(self.root, f"closes_{b:03d}.parquet")
+
+    def _read_bucket(self, b, tickers=None, start=None, end=None):
+        """Rows of one bucket, optionally only `tickers` and dates in [start, end), filtered inside the Parquet read."""
+        path = self._path(b)
+        if not os.path.exists(path):
+            return pd.DataFrame({"ticker": pd.Series(dtype=object),
+                                 "date": pd.Series(dtype="datetime64[ns]"),
+                                 "close": pd.Series(dtype="float64")})
+        filters = []
+        if tickers is not None:
+            filters.append(("ticker", "in", list(tickers)))
+        if start is not None:
+            filters.append(("date", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("date", "<", pd.Timestamp(end)))
+        return pd.read_parquet(path, filters=filters or None)
+
+    def _write_bucket(self, b, rows):
+        tmp = self._path(b) + ".tmp"
+        rows.sort_values(["date", "ticker"]).to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp, self._path(b))
+
+    def read(self, ticker):
+        """Cached closes for one ticker (empty Series if never fetched)."""
+        rows = self._read_bucket(self.bucket(ticker), [ticker]).sort_values("date")
+        return pd.Series(rows["close"].to_numpy(), index=pd.DatetimeIndex(rows["date"]), name=ticker)
+
+    def coverage(self, ticker):
+        return self._index.get(ticker)
+
+    # --- delta fetch
+    def _fetch(self, tickers, start, end):
+        """Provider call; tickers it reports missing just stay out of the frame here."""
+        try:
+            return self.provider(tickers, start, end)
+        except MissingTickers as e:
+            return e.close
+
+    def _missing(self, ticker, last, start, end):
+        """Windows still to fetch for one ticker, and the overlap day used to detect restatements."""
+        cov = self._index.get(ticker)
+        if cov is None:
+            return [(start, end)], None
+        cs, ce = cov
+        windows, overlap = [], None
+        if start < cs:
+            windows.append((start, cs))
+        if end > ce:
+            # refetch from the last cached row so a changed adjusted close shows up
+            overlap = last if not pd.isna(last) else None
+            windows.append((overlap if overlap is not None else ce, end))
+        return windows, overlap
+
+    def get(self, tickers, start, end=None):
+        """Wide frame of daily closes for `tickers` over [start, end)."""
+        today = pd.Timestamp.today().normalize()
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize() if end is not None else today + pd.Timedelta(days=1)
+        persist_end = min(end, today)        # today's bar may still move; never mark it as fetched
+        tickers = list(tickers)
+        if not tickers:
+            return pd.DataFrame()
+
+        # only this call's tickers and window are read; whole buckets only when new rows are written
+        ends = [self._index[t][1] for t in tickers if t in self._index and self._index[t][1] < end]
+        lo = min([start] + [ce - pd.Timedelta(days=OVERLAP_DAYS) for ce in ends])
+        where = {t: self.bucket(t) for t in tickers}
+        by_bucket = {}
+        for t in tickers:
+            by_bucket.setdefault(where[t], []).append(t)
+        cached = pd.concat([self._read_bucket(b, group, lo, end) for b, group in sorted(by_bucket.items())],
+                           ignore_index=True)
+        self.read_bytes = int(cached.memory_usage(deep=True).sum())
+        last = cached.groupby("ticker")["date"].max()
+        at_last = (cached["date"] == cached.groupby("ticker")["date"].transform("max")).to_numpy()
+        old_close = cached[at_last].set_index(["ticker", "date"])["close"]
+
+        overlaps, plan = {}, {}
+        for t in tickers:
+            windows, overlaps[t] = self._missing(t, last.get(t), start, end)
+            for w in windows:
+                plan.setdefault(w, []).append(t)
+
+        fresh, stale, dirty = [], set(), False
+        for (s, e), group in plan.items():
+            got = self._fetch(group, s, e)
+            # a backfill before a ticker's cached rows that comes back empty (and did not error)
+            # predates its listing: cover it, or every earlier `start` asks for it again
+            failed = getattr(getattr(self.provider, "last", None), "failed", {})
+            has = set() if got is None or got.empty else set(got.columns[got.notna().any()])
+            for t in group:
+                cov = self._index.get(t)
+                if cov is not None and e <= cov[0] and t in last.index and t not in has and t not in failed:
+                    self._index[t] = (s, cov[1])
+                    dirty = True
+            if not has:
+                continue                       # nothing came back; leave coverage alone so we retry
+            long = _to_long(got)
+            fresh.append(long)
+            chk = long.join(pd.Series(overlaps, name="overlap"), on="ticker")
+            chk = chk[chk["date"] == chk["overlap"]].set_index(["ticker", "date"])["close"]
+            if len(chk):
+                prev = old_close.reindex(chk.index)
+                moved = ~np.isclose(chk.to_numpy(), prev.to_numpy(), rtol=RESTATE_RTOL) & prev.notna().to_numpy()
+                stale.update(chk.index.get_level_values("ticker")[moved])
+            for t in has:                      # other failed / empty names keep their coverage and retry
+                cov = self._index.get(t)
+                cs, ce = cov or (s, min(e, persist_end))
+                self._index[t] = (min(cs, s), max(ce, min(e, persist_end)))
+                dirty |= self._index[t] != cov
+
+        # adjusted history was restated (split/dividend): replace it wholesale
+        redone = []
+        if stale:
+            group = sorted(stale)
+            lo = min(self._index[t][0] for t in group)
+            got = self._fetch(group, lo, end)
+            if got is not None and not got.empty:
+                redone = [t for t in group if t in got.columns and got[t].notna().any()]
+                fresh = [f[~f["ticker"].isin(redone)] for f in fresh]
+                fresh.append(_to_long(got))
+                cached = cached[~cached["ticker"].isin(redone)]
+                for t in redone:
+                    self._index[t] = (lo, persist_end)
+                dirty |= bool(redone)
+
+        new = cached.iloc[:0]
+        if fresh:
+            new = pd.concat(fresh, ignore_index=True).drop_duplicates(["ticker", "date"], keep="last")
+            # rows already cached with the same close (the re-fetched overlap day) are not rewritten
+            keep = new[new["date"] < persist_end]
+            known = old_close.reindex(pd.MultiIndex.from_frame(keep[["ticker", "date"]])).to_numpy()
+            keep = keep[(keep["close"].to_numpy() != known) | keep["ticker"].isin(redone).to_numpy()]
+            for b, part in keep.groupby(keep["ticker"].map(where)):
+                old = self._read_bucket(b)
+                old = old[~old["ticker"].isin(redone)]
+                merged = pd.concat([old, part], ignore_index=True).drop_duplicates(["ticker", "date"], keep="last")
+                self._write_bucket(b, merged)
+        if dirty:
+            self._save_index()
+
+        return _wide([cached, new], tickers, start, end - pd.Timedelta(days=1))
+
+
+def _wide(parts, tickers, first, last):
+    """
+    Long (ticker, date, close) parts -> date x ticker frame over [first, last],
+    later parts winning where they overlap. The rows are scattered straight
+    into the array: no concat, dedupe or pivot copies of the long rows.
+    """
+    cols = pd.Index(tickers)
+    first, last = np.datetime64(pd.Timestamp(first)), np.datetime64(pd.Timestamp(last))
+    picks = []
+    for p in parts:
+        t, names = pd.factorize(p["ticker"])
+        pos = cols.get_indexer(names)[t] if len(names) else t
+        d = p["date"].to_numpy()
+        keep = (d >= first) & (d <= last) & (pos >= 0)
+        picks.append((d[keep], pos[keep], p["close"].to_numpy(dtype="float64")[keep]))
+    dates = np.unique(np.concatenate([d for d, _, _ in picks]))
+    out = np.full((len(dates), len(cols)), np.nan)
+    for d, pos, close in picks:
+        out[np.searchsorted(dates, d), pos] = close
+    return pd.DataFrame(out, index=pd.DatetimeIndex(dates), columns=tickers)
+
+
+def _to_long(wide):
+    """Wide provider frame -> (ticker, date, close) rows, NaNs dropped."""
+    wide = wide.copy()
+    wide.index = pd.DatetimeIndex(wide.index).astype("datetime64[ns]")
+    wide.index.name = "date"
+    wide.columns.name = "ticker"
+    long = wide.stack().dropna().rename("close").reset_index()     # pandas 3 stack keeps the NaNs
+    long["ticker"] = long["ticker"].astype(object)
+    return long[["ticker", "date", "close"]]
@@ -0,0 +1,80 @@
+import os, json
+import numpy as np
+import pandas as pd
+
+
+class PricePanel:
+    """
+    Compact date x ticker float32 price matrix with integer ticker/date indexes.
+
+    Saved as a plain .npy so `load` can memory-map it: opening a 30y x 10k panel
+    only reads the index files, and pages come in as they are touched. Exposes
+    `index`, `columns` and `to_numpy` like a DataFrame, so momentum_signal and
+    eligible take it directly; `frame()` wraps the same buffer in a DataFrame
+    without copying for code that wants pandas.
+    """
+
+    def __init__(self, values, dates, tickers):
+        if values.shape != (len(dates), len(tickers)):
+            raise ValueError("values must be len(dates) x len(tickers)")
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        self.ticker_index = {t: i for i, t in enumerate(self.tickers)}
+
+    # --- DataFrame-ish surface
+    @property
+    def index(self):
+        return self.dates
+
+    @property
+    def columns(self):
+        return self.tickers
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def to_numpy(self, dtype=None):
+        return self.values if dtype is None else self.values.astype(dtype, copy=False)
+
+    def frame(self):
+        return pd.DataFrame(self.values, index=self.dates, columns=self.tickers, copy=False)
+
+    # --- lookups
+    def loc(self, tickers):
+        """Integer column positions for `tickers` (KeyError on unknown names)."""
+        return np.fromiter((self.ticker_index[t] for t in tickers), dtype=np.intp, count=len(tickers))
+
+    def take(self, tickers):
+        return self.values[:, self.loc(tickers)]
+
+    def returns(self):
+        """Simple daily returns, float32, one row shorter than the panel."""
+        v = self.values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return v[1:] / v[:-1] - np.float32(1.0)
+
+    def month_end(self):
+        """Last valid price of each calendar month, as a (small, in-memory) panel."""
+        return PricePanel.from_frame(self.frame().resample("ME").last(), dtype=self.values.dtype)
+
+    # --- construction / storage
+    @classmethod
+    def from_frame(cls, df, dtype=np.float32):
+        return cls(np.ascontiguousarray(df.to_numpy(dtype=dtype)), df.index, df.columns)
+
+    def save(self, root):
+        os.makedirs(root, exist_ok=True)
+        np.save(os.path.join(root, "values.npy"), np.ascontiguousarray(self.values))
+        np.save(os.path.join(root, "dates.npy"), self.dates.values.astype("datetime64[ns]"))
+        with open(os.path.join(root, "tickers.json"), "w", encoding="utf-8") as f:
+            json.dump([str(t) for t in self.tickers], f)
+
+    @classmethod
+    def load(cls, root, mmap=True):
+        values = np.load(os.path.join(root, "values.npy"), mmap_mode="r" if mmap else None)
+        dates = np.load(os.path.join(root, "dates.npy"))
+        with open(os.path.join(root, "tickers.json"), "r", encoding="utf-8") as f:
+            tickers = json.load(f)
+        return cls(values, dates, tickers)
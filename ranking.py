@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+
+# exchange suffix -> group label, for the suffixes momentum keeps
+EXCHANGES = {"": "US", ".TO": "TSX", ".V": "TSXV", ".NE": "NEO"}
+COUNTRIES = {"US": "US", "TSX": "CA", "TSXV": "CA", "NEO": "CA"}
+
+
+def exchange_groups(tickers):
+    """Exchange label per Yahoo ticker, from its suffix (unknown suffixes keep the suffix)."""
+    s = pd.Series(list(tickers), dtype=object)
+    suffix = s.str.extract(r"(\.[A-Z]{1,3})$", expand=False).fillna("")
+    return suffix.map(lambda x: EXCHANGES.get(x, x)).to_numpy()
+
+def country_groups(tickers):
+    return pd.Series(exchange_groups(tickers)).map(lambda x: COUNTRIES.get(x, x)).to_numpy()
+
+def group_labels(tickers, by, sector_map=None):
+    """Group label per ticker for `by` in {None, "exchange", "country", "sector"}."""
+    if by is None:
+        return None
+    if by == "exchange":
+        return exchange_groups(tickers)
+    if by == "country":
+        return country_groups(tickers)
+    if by == "sector":
+        if sector_map is None:
+            raise ValueError("Grouping by sector needs a sector_map.")
+        return np.array([sector_map.get(t, "Unknown") for t in tickers], dtype=object)
+    raise ValueError(f"Unknown grouping: {by}")
+
+
+def _codes(groups, n):
+    if groups is None:
+        return np.zeros(n, dtype=np.intp), 1
+    codes, uniques = pd.factorize(np.asarray(groups, dtype=object), use_na_sentinel=False)
+    if len(codes) != n:
+        raise ValueError(f"groups has {len(codes)} labels for {n} columns")
+    return codes.astype(np.intp), len(uniques)
+
+def rank_desc(values, groups=None):
+    """
+    Descending ranks of a 1-D signal, or of each row of a dates x tickers array,
+    optionally within groups of columns. Returns (rank, pct_rank) as float64
+    arrays: rank breaks ties by position like rank(method="first"), pct_rank is
+    the tie-averaged rank over the valid count like rank(pct=True), and NaN
+    stays NaN. One stable argsort per row block for all groups at once.
+    """
+    x = np.asarray(values, dtype="float64")
+    one = x.ndim == 1
+    x = np.atleast_2d(x)
+    rows, n = x.shape
+    codes, ng = _codes(groups, n)
+
+    neg = -x                                            # NaN sorts last
+    order = np.argsort(neg, axis=1, kind="stable")
+    if ng > 1:
+        order = np.take_along_axis(order, np.argsort(codes[order], axis=1, kind="stable"), axis=1)
+    sx = np.take_along_axis(neg, order, axis=1)
+
+    sizes = np.bincount(codes, minlength=ng)
+    gstart = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    gpos = np.repeat(np.arange(ng), sizes)             # group of each sorted position (same on every row)
+    pos = np.arange(n)
+    first = (pos - gstart[gpos] + 1).astype("float64")
+
+    # tie blocks: a new block starts where the value or the group changes
+    new = np.ones((rows, n), dtype=bool)
+    new[:, 1:] = (sx[:, 1:] != sx[:, :-1]) | (gpos[1:] != gpos[:-1])
+    end = np.ones((rows, n), dtype=bool)
+    end[:, :-1] = new[:, 1:]
+    bs = np.maximum.accumulate(np.where(new, pos, 0), axis=1)
+    be = (n - 1) - np.maximum.accumulate(np.where(end[:, ::-1], pos, 0), axis=1)[:, ::-1]
+    avg = (bs + be) / 2.0 - gstart[gpos] + 1.0
+
+    valid = ~np.isnan(sx)
+    counts = np.add.reduceat(valid.astype(np.intp), gstart, axis=1) if n else np.zeros((rows, ng))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct_s = np.where(valid, avg / counts[:, gpos], np.nan)
+    first_s = np.where(valid, first, np.nan)
+
+    rank, pct = np.empty_like(x), np.empty_like(x)
+    np.put_along_axis(rank, order, first_s, axis=1)
+    np.put_along_axis(pct, order, pct_s, axis=1)
+    return (rank[0], pct[0]) if one else (rank, pct)
+
+def rank_frame(sig, groups=None):
+    """rank_desc for a Series (one cross-section) or a dates x tickers DataFrame; keeps the labels."""
+    if groups is not None and isinstance(groups, (dict, pd.Series)):
+        cols = sig.index if isinstance(sig, pd.Series) else sig.columns
+        groups = pd.Series(groups).reindex(cols).to_numpy()
+    rank, pct = rank_desc(sig.to_numpy(dtype="float64"), groups)
+    if isinstance(sig, pd.Series):
+        return pd.Series(rank, index=sig.index), pd.Series(pct, index=sig.index)
+    return (pd.DataFrame(rank, index=sig.index, columns=sig.columns),
+            pd.DataFrame(pct, index=sig.index, columns=sig.columns))
+
+
+def _count_le(n, frac):
+    """How many of the pct ranks 1/n .. n/n are <= frac (same float test as a pct_rank mask)."""
+    k = int(np.floor(frac * n))
+    while k < n and (k + 1) / n <= frac:
+        k += 1
+    while k > 0 and k / n > frac:
+        k -= 1
+    return k
+
+def select(values, k, largest=True, ordered=True):
+    """Positions of the k largest (or smallest) non-NaN values of a 1-D array, best first if `ordered`."""
+    x = np.asarray(values, dtype="float64")
+    idx = np.flatnonzero(~np.isnan(x))
+    k = min(k, len(idx))
+    if k == 0:
+        return idx[:0]
+    v = -x[idx] if largest else x[idx]
+    part = np.argpartition(v, k - 1)[:k] if k < len(idx) else np.arange(len(idx))
+    return idx[part[np.argsort(v[part], kind="stable")]] if ordered else idx[part]
+
+def _counts_le(n, frac):
+    """_count_le for an array of counts, computed once per distinct count."""
+    u, inv = np.unique(n, return_inverse=True)
+    return np.array([_count_le(int(m), frac) for m in u], dtype=np.intp)[inv]
+
+def _extremes(x, k, largest=True):
+    """
+    Mask of the k[r] largest (or smallest) non-NaN values in each row r of x.
+    One argpartition over the row axis at the largest k pulls every row's
+    candidates to the front and only those get sorted. NaN becomes +inf (and
+    a real +inf the largest float) so the partition runs without NaN checks.
+    """
+    mask = np.zeros(x.shape, dtype=bool)
+    top = int(k.max(initial=0))
+    if top:
+        v = -x if largest else x.copy()
+        if np.isinf(x).any():
+            v[v == np.inf] = np.finfo(v.dtype).max
+        np.fmin(v, np.inf, out=v)
+        part = np.argpartition(v, top - 1, axis=1)[:, :top]
+        part = np.take_along_axis(part, np.argsort(np.take_along_axis(v, part, axis=1), axis=1), axis=1)
+        np.put_along_axis(mask, part, np.arange(top) < k[:, None], axis=1)
+    return mask
+
+def tail_masks(values, lower=0.10, upper=0.90, groups=None):
+    """
+    Decile-style tails without a full ranking: (low, high) boolean arrays where
+    low marks pct_rank <= lower (strongest names) and high marks pct_rank > upper
+    (weakest), per row and per group. Tail sizes match a pct_rank mask exactly;
+    only ties at the cut may land on either side. Each tail is one
+    argpartition over all rows of a group plus a sort of the tail alone.
+    """
+    x = np.asarray(values, dtype="float64")
+    one = x.ndim == 1
+    x = np.atleast_2d(x)
+    codes, ng = _codes(groups, x.shape[1])
+    cols = [np.flatnonzero(codes == g) for g in range(ng)] if ng > 1 else [np.arange(x.shape[1])]
+    low = np.zeros(x.shape, dtype=bool)
+    high = np.zeros(x.shape, dtype=bool)
+    for c in cols:
+        sub = x[:, c]
+        n = (~np.isnan(sub)).sum(axis=1)
+        low[:, c] = _extremes(sub, _counts_le(n, lower), largest=True)
+        high[:, c] = _extremes(sub, n - _counts_le(n, upper), largest=False)
+    return (low[0], high[0]) if one else (low, high)
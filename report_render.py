@@ -0,0 +1,113 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import matplotlib
+matplotlib.use("Agg")                  # headless; must happen before pyplot is imported below
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from momentum import OUT_DIR
+from snapshots import latest_snapshot, read_ranked
+from price_cache import PriceStore
+from presentation_graph import plot_stock_data
+from appendix_visual import create_top_performers_table, TAILS
+from strat_analysis import plot_cumulative
+
+
+CHART_DIR   = os.path.join(OUT_DIR, "charts")
+MAX_WORKERS = os.cpu_count() or 2
+FORMAT      = "png"                    # or "svg"
+
+
+@dataclass
+class ChartJob:
+    kind: str                          # key of RENDERERS
+    path: str
+    params: dict = field(default_factory=dict)
+
+
+def _entry_chart(path, close, ticker, entry_date):
+    return plot_stock_data(close.to_frame(name="Close"), ticker,
+                           split_date=pd.Timestamp(entry_date), path=path, show=False)
+
+def _decile_table(path, title, tail="winners", source=None):
+    return create_top_performers_table(source, path, show=False, title=title, tail=tail)
+
+def _cumulative(path, curves, title, colors, **kw):
+    return plot_cumulative(curves, title, colors, path=path, show=False, **kw)
+
+RENDERERS = {
+    "entry_chart": _entry_chart,
+    "decile_table": _decile_table,
+    "cumulative": _cumulative,
+}
+
+
+def render(job):
+    """Render one job to its file; runs inside a worker process."""
+    fig = RENDERERS[job.kind](job.path, **job.params)
+    plt.close(fig)
+    return job.path
+
+
+def render_jobs(jobs, max_workers=MAX_WORKERS):
+    """
+    Render chart jobs across a process pool. Returns (written paths, {path: error})
+    so one broken chart does not cost the rest of the batch.
+    """
+    for job in jobs:
+        os.makedirs(os.path.dirname(job.path) or ".", exist_ok=True)
+    done, failed = [], {}
+    if max_workers <= 1:
+        for job in jobs:
+            try:
+                done.append(render(job))
+            except Exception as e:
+                failed[job.path] = repr(e)
+        return done, failed
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futs = {pool.submit(render, job): job for job in jobs}
+        for f in as_completed(futs):
+            try:
+                done.append(f.result())
+            except Exception as e:
+                failed[futs[f].path] = repr(e)
+    return done, failed
+
+
+def entry_chart_jobs(tickers, start, end, entry_date, out_dir=CHART_DIR, fmt=FORMAT, store=None):
+    """One entry-date chart per holding, all prices pulled in a single shared fetch."""
+    close = (store or PriceStore()).get(list(tickers), start, end)
+    jobs = []
+    for t in tickers:
+        s = close[t].dropna() if t in close.columns else None
+        if s is None or s.empty:
+            continue
+        jobs.append(ChartJob("entry_chart", os.path.join(out_dir, f"{t}.{fmt}"),
+                             {"close": s, "ticker": t, "entry_date": entry_date}))
+    return jobs
+
+
+def main():
+    snap = latest_snapshot(OUT_DIR)
+    if snap is None:
+        raise FileNotFoundError(f"No ranked snapshot under {OUT_DIR}; run momentum.py first.")
+    holdings = pd.concat([read_ranked(snap, columns=["ticker"], filters=TAILS[t])["ticker"]
+                          for t in ("winners", "losers")]).unique()
+
+    entry = pd.Timestamp.today().normalize() - pd.offsets.MonthBegin(1)
+    jobs = entry_chart_jobs(holdings, entry - pd.DateOffset(months=10), None, entry)
+    jobs += [
+        ChartJob("decile_table", os.path.join(CHART_DIR, f"top_decile.{FORMAT}"),
+                 {"source": snap, "tail": "winners", "title": "Top 10 Momentum Performers\n(12-1 Month Returns)"}),
+        ChartJob("decile_table", os.path.join(CHART_DIR, f"bottom_decile.{FORMAT}"),
+                 {"source": snap, "tail": "losers", "title": "Bottom Decile Momentum\n(12-1 Month Returns)"}),
+    ]
+    done, failed = render_jobs(jobs)
+    print(f"Rendered {len(done)} charts to {CHART_DIR}" + (f"; {len(failed)} failed" if failed else ""))
+    for path, err in failed.items():
+        print(f"  {path}: {err}")
+
+if __name__ == "__main__":
+    main()
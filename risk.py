@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+
+BLOCK       = 512      # tickers per block when building N x N matrices
+EWMA_LAMBDA = 0.94     # RiskMetrics daily decay
+
+
+def _blocks(n, block):
+    return [(i, min(i + block, n)) for i in range(0, n, block)]
+
+def _as_array(rets):
+    return np.asarray(rets.to_numpy(), dtype="float64"), pd.Index(rets.columns)
+
+
+class SampleCov:
+    """
+    Pairwise-complete sample covariance / correlation across a whole universe.
+
+    Kept as running sums over the days where both names have a return (count,
+    sum x, sum x^2, sum xy), so `update` folds in one more day in O(N^2) without
+    touching history, and cov()/corr() match DataFrame.cov()/corr(). The N x N
+    sums are filled in BLOCK x BLOCK tiles so temporaries stay small.
+    """
+
+    def __init__(self, tickers):
+        n = len(tickers)
+        self.tickers = pd.Index(tickers)
+        self.n = np.zeros((n, n))
+        self.sx = np.zeros((n, n))      # sx[i, j] = sum of x_i over days both i and j are present
+        self.sxx = np.zeros((n, n))
+        self.sxy = np.zeros((n, n))
+
+    @classmethod
+    def from_returns(cls, rets, block=BLOCK):
+        r, tickers = _as_array(rets)
+        self = cls(tickers)
+        m = (~np.isnan(r)).astype("float64")
+        x = np.where(m > 0, r, 0.0)
+        xx = x * x
+        for i0, i1 in _blocks(len(tickers), block):
+            for j0, j1 in _blocks(len(tickers), block):
+                if j0 < i0:
+                    continue
+                mi, mj = m[:, i0:i1], m[:, j0:j1]
+                self.n[i0:i1, j0:j1] = mi.T @ mj
+                self.sx[i0:i1, j0:j1] = x[:, i0:i1].T @ mj
+                self.sx[j0:j1, i0:i1] = x[:, j0:j1].T @ mi
+                self.sxx[i0:i1, j0:j1] = xx[:, i0:i1].T @ mj
+                self.sxx[j0:j1, i0:i1] = xx[:, j0:j1].T @ mi
+                self.sxy[i0:i1, j0:j1] = x[:, i0:i1].T @ x[:, j0:j1]
+                if j0 != i0:
+                    self.n[j0:j1, i0:i1] = self.n[i0:i1, j0:j1].T
+                    self.sxy[j0:j1, i0:i1] = self.sxy[i0:i1, j0:j1].T
+        return self
+
+    def update(self, r):
+        """Fold in one day of returns (vector aligned with `tickers`, NaN = missing)."""
+        r = np.asarray(r, dtype="float64")
+        m = (~np.isnan(r)).astype("float64")
+        x = np.where(m > 0, r, 0.0)
+        self.n += np.outer(m, m)
+        self.sx += np.outer(x, m)
+        self.sxx += np.outer(x * x, m)
+        self.sxy += np.outer(x, x)
+
+    def _cov(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.sxy - self.sx * self.sx.T / self.n) / (self.n - 1)
+
+    def cov(self):
+        return pd.DataFrame(self._cov(), index=self.tickers, columns=self.tickers)
+
+    def corr(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self.sxx - self.sx ** 2 / self.n           # var of i over the days shared with j
+            c = (self.sxy - self.sx * self.sx.T / self.n) / np.sqrt(var * var.T)
+        np.fill_diagonal(c, 1.0)
+        return pd.DataFrame(c, index=self.tickers, columns=self.tickers)
+
+    def sleeve_corr(self, wa, wb):
+        """Correlation of two weighted sleeves from the full covariance matrix."""
+        return _quad_corr(np.nan_to_num(self._cov()), wa, wb)
+
+
+class EwmaCov:
+    """
+    Zero-mean exponentially weighted covariance (RiskMetrics):
+    S_t = lam * S_{t-1} + (1 - lam) * r_t r_t'. Missing returns count as zero.
+    The batch build is the same recursion started from zero, computed as a
+    weighted cross-product in blocks, so `update` continues it exactly.
+    """
+
+    def __init__(self, tickers, lam=EWMA_LAMBDA):
+        self.tickers = pd.Index(tickers)
+        self.lam = lam
+        self.s = np.zeros((len(tickers), len(tickers)))
+
+    @classmethod
+    def from_returns(cls, rets, lam=EWMA_LAMBDA, block=BLOCK):
+        r, tickers = _as_array(rets)
+        self = cls(tickers, lam)
+        x = np.nan_to_num(r)
+        w = (1 - lam) * lam ** np.arange(len(x) - 1, -1, -1)
+        xw = x * w[:, None]
+        for i0, i1 in _blocks(len(tickers), block):
+            for j0, j1 in _blocks(len(tickers), block):
+                if j0 < i0:
+                    continue
+                self.s[i0:i1, j0:j1] = xw[:, i0:i1].T @ x[:, j0:j1]
+                self.s[j0:j1, i0:i1] = self.s[i0:i1, j0:j1].T
+        return self
+
+    def update(self, r):
+        x = np.nan_to_num(np.asarray(r, dtype="float64"))
+        self.s *= self.lam
+        self.s += (1 - self.lam) * np.outer(x, x)
+
+    def cov(self):
+        return pd.DataFrame(self.s, index=self.tickers, columns=self.tickers)
+
+    def corr(self):
+        d = np.sqrt(np.diag(self.s))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            c = self.s / np.outer(d, d)
+        return pd.DataFrame(c, index=self.tickers, columns=self.tickers)
+
+    def sleeve_corr(self, wa, wb):
+        return _quad_corr(self.s, wa, wb)
+
+
+def _quad_corr(cov, wa, wb):
+    ab, aa, bb = wa @ cov @ wb, wa @ cov @ wa, wb @ cov @ wb
+    return ab / np.sqrt(aa * bb)
+
+def sleeve_weights(tickers, sleeve):
+    """Equal weights over the names of `sleeve` present in `tickers`, as a vector aligned with it."""
+    w = pd.Index(tickers).isin(list(sleeve)).astype("float64")
+    return w / w.sum()
+
+def rolling_sleeve_corr(rets, wa, wb, window):
+    """
+    Rolling correlation of two sleeves, read off the rolling covariance of the
+    universe projected on the sleeve weights (w_a' S_t w_b over each window),
+    without materialising an N x N matrix per day.
+    """
+    r, _ = _as_array(rets)
+    proj = np.nan_to_num(r) @ np.column_stack([wa, wb])
+    p = pd.DataFrame(proj, index=rets.index)
+    return p[0].rolling(window).corr(p[1])
@@ -0,0 +1,240 @@
+import os, json, asyncio, argparse, http.client
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from momentum import OUT_DIR, QUARTILES
+from snapshots import latest_snapshot, read_ranked
+
+
+HOST          = "127.0.0.1"
+PORT          = 8336
+POLL_INTERVAL = 1.0        # seconds between snapshot mtime checks
+MAX_K         = 1000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+class SignalIndex:
+    """
+    One ranked snapshot held in rank order. Each row is serialised to JSON once
+    at load, so top-k / bottom-k are a slice and a join, a ticker lookup is a
+    dict hit, and quartile membership is a precomputed list in rank order.
+    """
+
+    def __init__(self, df, mtime=None):
+        df = df.sort_values("rank", kind="stable").reset_index(drop=True)
+        self.mtime = mtime
+        self.n = len(df)
+        self.tickers = df["ticker"].tolist()
+        self.pos = {t: i for i, t in enumerate(self.tickers)}
+        self.pct = df["pct_rank"].to_numpy(dtype="float64")
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        self.rows = [json.dumps(r).encode() for r in rows]
+        self.rank = df["rank"].to_numpy(dtype="float64")
+        self.group = df["group"].tolist() if "group" in df else None
+        self.group_n = df["group"].value_counts().to_dict() if "group" in df else None
+        q = df["quartile"].to_numpy() if "quartile" in df else np.array([None] * self.n)
+        self.quartiles = {label: df["ticker"][q == label].tolist() for label in QUARTILES if (q == label).any()}
+
+    @classmethod
+    def load(cls, path):
+        mtime = os.stat(path).st_mtime_ns
+        return cls(read_ranked(path), mtime)
+
+    def top(self, k):
+        return b"[" + b",".join(self.rows[:k]) + b"]"
+
+    def bottom(self, k):
+        return b"[" + b",".join(reversed(self.rows[max(self.n - k, 0):])) + b"]"
+
+    def ticker(self, t):
+        i = self.pos.get(t)
+        return None if i is None else self.rows[i]
+
+    def percentile(self, t):
+        i = self.pos.get(t)
+        if i is None:
+            return None
+        body = {"ticker": t, "rank": int(self.rank[i]), "n": self.n, "pct_rank": float(self.pct[i])}
+        if self.group is not None:                                  # ranked within groups
+            body.update(group=self.group[i], n=self.group_n[self.group[i]])
+        return json.dumps(body).encode()
+
+    def quartile(self, label):
+        """Members of one quartile in rank order; `label` is "1".."4" or a full label such as "Q2"."""
+        if label.isdigit() and 1 <= int(label) <= len(QUARTILES):
+            label = QUARTILES[int(label) - 1]
+        label = next((q for q in QUARTILES if q == label or q.split()[0] == label), label)
+        if label not in self.quartiles:
+            return None
+        return json.dumps({"quartile": label, "tickers": self.quartiles[label]}).encode()
+
+
+class SignalServer:
+    """
+    asyncio HTTP/1.1 (keep-alive) server over the latest ranked snapshot, on TCP
+    or a Unix socket. Serves `path` (a snapshot .parquet or CSV export), or else
+    the newest dated snapshot under `out_dir`. A background task polls for a
+    newer snapshot or a changed mtime and swaps in a fresh index; queries in
+    flight keep the old one.
+
+      GET /top?k=10            strongest k names (rank 1 first)
+      GET /bottom?k=10         weakest k names (last rank first)
+      GET /ticker/AAPL         full row for one name
+      GET /percentile/AAPL     rank, n and pct_rank for one name
+      GET /quartile/1          members of a quartile (1..4 or "Q1")
+      GET /health              snapshot path, size and mtime
+    """
+
+    def __init__(self, path=None, poll_interval=POLL_INTERVAL, out_dir=None):
+        self.fixed = path
+        self.out_dir = out_dir or OUT_DIR
+        self.path = path
+        self.poll_interval = poll_interval
+        self.index = None
+        self.reloads = 0
+
+    async def reload(self):
+        """Load the snapshot if a newer one appeared or it changed; parsing runs off the event loop."""
+        path = self.fixed or latest_snapshot(self.out_dir)
+        if path is None:
+            return False
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if self.index is not None and path == self.path and self.index.mtime == mtime:
+            return False
+        try:
+            index = await asyncio.get_running_loop().run_in_executor(None, SignalIndex.load, path)
+        except (OSError, ValueError, KeyError) as e:          # half-written or malformed: keep serving the old one
+            print(f"Reload failed for {path}: {e!r}")
+            return False
+        self.path, self.index = path, index
+        self.reloads += 1
+        return True
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload()
+
+    def respond(self, method, target):
+        if method != "GET":
+            return 405, _error("GET only")
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        if parts == ["health"]:
+            ix = self.index
+            return 200, json.dumps({"path": self.path, "loaded": ix is not None, "n": ix.n if ix else 0,
+                                    "mtime_ns": ix.mtime if ix else None, "reloads": self.reloads}).encode()
+        ix = self.index
+        if ix is None:
+            return 503, _error("no snapshot loaded")
+        if not parts:
+            return 404, _error("unknown endpoint")
+        name, args = parts[0], parts[1:]
+
+        if name in ("top", "bottom"):
+            try:
+                k = int(query.get("k", ["10"])[0])
+            except ValueError:
+                return 400, _error("k must be an integer")
+            k = min(max(k, 0), MAX_K)
+            return 200, ix.top(k) if name == "top" else ix.bottom(k)
+        if name in ("ticker", "percentile", "quartile"):
+            key = args[0] if args else query.get("ticker" if name != "quartile" else "q", [""])[0]
+            if not key:
+                return 400, _error(f"/{name} needs an argument")
+            body = {"ticker": ix.ticker, "percentile": ix.percentile, "quartile": ix.quartile}[name](
+                key.upper() if name != "quartile" else key)
+            return (200, body) if body is not None else (404, _error(f"{key} not in snapshot"))
+        return 404, _error("unknown endpoint")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await _send(writer, 400, _error("malformed request line"), close=True)
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip().lower()
+                close = headers.get("connection") == "close" or (
+                    version == "HTTP/1.0" and headers.get("connection") != "keep-alive")
+                status, body = self.respond(method, target)
+                await _send(writer, status, body, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, unix=None):
+        await self.reload()
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, path=unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        where = unix or f"http://{host}:{port}"
+        print(f"Serving {self.path} on {where} ({self.index.n if self.index else 0} tickers)")
+        watcher = asyncio.create_task(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def _error(msg):
+    return json.dumps({"error": msg}).encode()
+
+async def _send(writer, status, body, close=False):
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def query(path, host=HOST, port=PORT, timeout=5.0):
+    """Blocking one-shot client for scripts: query("/percentile/AAPL") -> parsed JSON."""
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        body = json.loads(resp.read())
+        if resp.status != 200:
+            raise LookupError(f"{resp.status}: {body.get('error')}")
+        return body
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve rank / percentile / quartile queries over the latest snapshot.")
+    ap.add_argument("--snapshot", default=None, help="snapshot .parquet or CSV export to serve (default: newest under OUT_DIR)")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--unix", default=None, help="listen on a Unix socket instead of TCP")
+    ap.add_argument("--poll", type=float, default=POLL_INTERVAL, help="seconds between reload checks")
+    args = ap.parse_args()
+    try:
+        asyncio.run(SignalServer(args.snapshot, args.poll).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
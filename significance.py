@@ -0,0 +1,194 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+N_BOOT      = 10_000
+N_PERM      = 10_000
+BLOCK       = 5            # days per bootstrap block (a trading week) to keep short-range autocorrelation
+ALPHA       = 0.05         # two-sided; intervals are the alpha/2 and 1 - alpha/2 percentiles
+ANNUAL      = 252
+CHUNK       = 5_000        # resamples per index matrix
+MEMORY_MB   = 512          # resampled statistics held at once; more sleeves are split into blocks
+MAX_WORKERS = os.cpu_count() or 2
+
+
+# --- resample index matrices
+
+def block_indices(n, size, block=BLOCK, rng=None):
+    """size x n row indices of a circular moving-block bootstrap of n observations."""
+    rng = rng if rng is not None else np.random.default_rng()
+    k = -(-n // block)
+    starts = rng.integers(0, n, (size, k))
+    return ((starts[:, :, None] + np.arange(block)) % n).reshape(size, -1)[:, :n]
+
+def index_counts(idx, n):
+    """How often each of the n rows appears in each resample: size x n, so sums over a resample are C @ X."""
+    flat = (np.arange(len(idx))[:, None] * n + idx).ravel()
+    return np.bincount(flat, minlength=len(idx) * n).reshape(len(idx), n).astype("float64")
+
+
+# --- statistics from per-resample sums
+#
+# Every statistic here depends on the resampled days only through sums of a
+# few per-day features (r, r^2, log1p r, r_a r_b), so a whole batch of
+# resamples is one counts @ features product, with no resampled return tensor.
+
+def _moments(s1, s2, n):
+    mean = s1 / n
+    with np.errstate(invalid="ignore"):
+        sd = np.sqrt(np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1))
+    return mean, sd
+
+def _sharpe(mean, sd):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return mean / sd * np.sqrt(ANNUAL)
+
+def _sleeve_features(r):
+    return np.concatenate([r, r * r, np.log1p(r)], axis=1)
+
+def _sleeve_stats(s, n):
+    k = s.shape[1] // 3
+    mean, sd = _moments(s[:, :k], s[:, k:2 * k], n)
+    return {"total_return": np.expm1(s[:, 2 * k:]), "ann_vol": sd * np.sqrt(ANNUAL), "sharpe": _sharpe(mean, sd)}
+
+def _pair_features(a, b):
+    return np.concatenate([_sleeve_features(a), _sleeve_features(b), a * b], axis=1)
+
+def _pair_stats(s, n):
+    p = s.shape[1] // 7
+    ma, sda = _moments(s[:, :p], s[:, p:2 * p], n)
+    mb, sdb = _moments(s[:, 3 * p:4 * p], s[:, 4 * p:5 * p], n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (s[:, 6 * p:] - s[:, :p] * s[:, 3 * p:4 * p] / n) / (n - 1) / (sda * sdb)
+    return {"diff_total_return": np.expm1(s[:, 2 * p:3 * p]) - np.expm1(s[:, 5 * p:6 * p]),
+            "diff_sharpe": _sharpe(ma, sda) - _sharpe(mb, sdb),
+            "corr": corr}
+
+_KINDS = {"sleeve": _sleeve_stats, "pair": _pair_stats}
+_NO_P  = {"ann_vol"}          # no null of zero to test
+
+
+def _boot_block(kind, feats, names, n_boot, block, alpha, seed, chunk):
+    """Bootstrap one block of sleeves or pairs; the same seed gives the same resamples in every block."""
+    stat_fn = _KINDS[kind]
+    n = len(feats)
+    dist = None
+    for i, ss in enumerate(np.random.SeedSequence(seed).spawn(-(-n_boot // chunk))):
+        lo = i * chunk
+        size = min(chunk, n_boot - lo)
+        counts = index_counts(block_indices(n, size, block, np.random.default_rng(ss)), n)
+        out = stat_fn(counts @ feats, n)
+        if dist is None:
+            dist = {k: np.empty((v.shape[1], n_boot)) for k, v in out.items()}   # rows contiguous for the quantiles
+        for k, v in out.items():
+            dist[k][:, lo:lo + size] = v.T
+    est = stat_fn(feats.sum(axis=0, keepdims=True), n)
+
+    rows = []
+    for k, d in dist.items():
+        quantile = np.nanquantile if np.isnan(d).any() else np.quantile     # nanquantile goes row by row
+        q = quantile(d, [alpha / 2, 1 - alpha / 2], axis=1)
+        p = np.minimum(2 * np.minimum((d <= 0).mean(axis=1), (d >= 0).mean(axis=1)), 1.0)
+        rows.append(pd.DataFrame({"item": names, "stat": k, "estimate": est[k][0], "lo": q[0], "hi": q[1],
+                                  "p_value": np.nan if k in _NO_P else p}))
+    return pd.concat(rows, ignore_index=True)
+
+def _pair_name(a, b):
+    return f"{a} - {b}"
+
+def _blocks(n_items, per_item, n_boot):
+    size = max(1, int(MEMORY_MB * 2**20 // (n_boot * per_item * 8)))
+    return [(i, min(i + size, n_items)) for i in range(0, n_items, size)]
+
+def bootstrap(rets, pairs=(), n_boot=N_BOOT, block=BLOCK, alpha=ALPHA, seed=0, max_workers=1, chunk=CHUNK):
+    """
+    Block-bootstrap confidence intervals for every column of `rets` (days x
+    sleeves daily returns; days with a NaN in any column are dropped): total
+    return, annualised vol and Sharpe, plus total-return gap, Sharpe gap and
+    correlation for each (a, b) in `pairs`. Resamples are drawn as index
+    matrices in chunks of `chunk` and evaluated as counts @ features in one
+    product per chunk; sleeves are split into blocks so the held statistics
+    stay under MEMORY_MB, and with `max_workers` > 1 the blocks run in a
+    process pool. `p_value` is the two-sided share of resamples on the far
+    side of zero. Returns a tidy frame: item, stat, estimate, lo, hi, p_value.
+    """
+    rets = rets.dropna()
+    r = rets.to_numpy(dtype="float64")
+    names = list(rets.columns)
+    pos = {c: i for i, c in enumerate(names)}
+    ia = [pos[a] for a, _ in pairs]
+    ib = [pos[b] for _, b in pairs]
+    pair_names = [_pair_name(a, b) for a, b in pairs]
+
+    jobs = []
+    for lo, hi in _blocks(len(names), 3, n_boot):
+        jobs.append(("sleeve", _sleeve_features(r[:, lo:hi]), names[lo:hi]))
+    for lo, hi in _blocks(len(pair_names), 3, n_boot):
+        jobs.append(("pair", _pair_features(r[:, ia[lo:hi]], r[:, ib[lo:hi]]), pair_names[lo:hi]))
+    args = [(k, f, nm, n_boot, block, alpha, seed, chunk) for k, f, nm in jobs]
+    if max_workers <= 1 or len(args) <= 1:
+        parts = [_boot_block(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(args))) as pool:
+            parts = list(pool.map(_boot_block, *zip(*args)))
+    return pd.concat(parts, ignore_index=True).set_index(["item", "stat"])
+
+
+def permutation_test(rets, pairs, n_perm=N_PERM, seed=0, chunk=CHUNK):
+    """
+    Two-sided permutation p-values for each (a, b) in `pairs`. Mean and Sharpe
+    gaps: the two sleeves' labels are swapped on a random subset of days (a
+    paired test, so common market moves cancel). Correlation: the second
+    sleeve's days are shuffled against the first. Every batch of permutations
+    is a matrix product on per-day features and the p-values are counted as
+    the batches go, so nothing of size n_perm is kept. Returns item, stat,
+    estimate, p_value.
+    """
+    rets = rets.dropna()
+    r = rets.to_numpy(dtype="float64")
+    pos = {c: i for i, c in enumerate(rets.columns)}
+    a = r[:, [pos[x] for x, _ in pairs]]
+    b = r[:, [pos[y] for _, y in pairs]]
+    n, p = a.shape
+    d1, d2 = b - a, b * b - a * a
+    sa1, sa2, sb1, sb2, sab = a.sum(0), (a * a).sum(0), b.sum(0), (b * b).sum(0), (a * b).sum(0)
+
+    def gaps(sa1, sa2, sb1, sb2):
+        ma, sda = _moments(sa1, sa2, n)
+        mb, sdb = _moments(sb1, sb2, n)
+        return {"diff_mean": (ma - mb) * ANNUAL, "diff_sharpe": _sharpe(ma, sda) - _sharpe(mb, sdb)}
+
+    def corr(sab):
+        _, sda = _moments(sa1, sa2, n)
+        _, sdb = _moments(sb1, sb2, n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (sab - sa1 * sb1 / n) / (n - 1) / (sda * sdb)
+
+    obs = {**gaps(sa1, sa2, sb1, sb2), "corr": corr(sab)}
+    hits = {k: np.zeros(p) for k in obs}
+    step = max(1, min(chunk, int(MEMORY_MB * 2**20 // (n * p * 8 * 2))))
+    done = 0
+    for ss in np.random.SeedSequence(seed).spawn(-(-n_perm // step)):
+        rng = np.random.default_rng(ss)
+        size = min(step, n_perm - done)
+        swap = (rng.random((size, n)) < 0.5).astype("float64")
+        sw1, sw2 = swap @ d1, swap @ d2
+        perm = gaps(sa1 + sw1, sa2 + sw2, sb1 - sw1, sb2 - sw2)
+        order = np.argsort(rng.random((size, n)), axis=1)
+        perm["corr"] = corr(np.einsum("snp,np->sp", b[order], a))
+        for k, v in perm.items():
+            hits[k] += (np.abs(v) >= np.abs(obs[k]) - 1e-12).sum(axis=0)
+        done += size
+
+    names = [_pair_name(x, y) for x, y in pairs]
+    return pd.concat([pd.DataFrame({"item": names, "stat": k, "estimate": obs[k], "p_value": (hits[k] + 1) / (n_perm + 1)})
+                      for k in obs], ignore_index=True).set_index(["item", "stat"])
+
+
+def fmt_ci(table, item, stat, spec=".2%"):
+    """ "[lo, hi]" for one row of a bootstrap() table, for printing next to a point estimate."""
+    row = table.loc[(item, stat)]
+    return f"[{row['lo']:{spec}}, {row['hi']:{spec}}]"
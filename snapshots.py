@@ -0,0 +1,86 @@
+import os, re
+import pandas as pd
+
+
+SNAPSHOT_DIR   = "snapshots"            # under the run's output directory
+ROW_GROUP_SIZE = 1024                   # rows are in rank order, so pct_rank / rank filters skip whole groups
+_NAME          = re.compile(r"^ranked_(\d{4}-\d{2}-\d{2})\.parquet$")
+
+DTYPES = {"ticker": "string", "mom_12_1": "float64", "ret_t_1": "float64", "rank": "int32",
+          "pct_rank": "float64", "quartile": "category", "signal": "category", "group": "category"}
+
+
+def snapshot_dir(out_dir):
+    return os.path.join(out_dir, SNAPSHOT_DIR)
+
+def snapshot_path(out_dir, date):
+    return os.path.join(snapshot_dir(out_dir), f"ranked_{pd.Timestamp(date):%Y-%m-%d}.parquet")
+
+def write_snapshot(full, out_dir, date=None):
+    """
+    Write one ranked cross-section as a typed Parquet snapshot named by its run
+    date (today by default; a rerun on the same day replaces it). Swapped in
+    atomically so readers never see a partial file. Returns the path.
+    """
+    path = snapshot_path(out_dir, date if date is not None else pd.Timestamp.today())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = full.sort_values("rank", kind="stable").reset_index(drop=True)
+    df = df.astype({c: t for c, t in DTYPES.items() if c in df.columns})
+    df.to_parquet(path + ".tmp", index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(path + ".tmp", path)
+    return path
+
+def list_snapshots(out_dir):
+    """Snapshot paths by date, oldest first (empty Series when there are none)."""
+    root = snapshot_dir(out_dir)
+    found = {}
+    if os.path.isdir(root):
+        for f in os.listdir(root):
+            m = _NAME.match(f)
+            if m:
+                found[pd.Timestamp(m.group(1))] = os.path.join(root, f)
+    return pd.Series(found, dtype=object).sort_index()
+
+def latest_snapshot(out_dir):
+    snaps = list_snapshots(out_dir)
+    return snaps.iloc[-1] if len(snaps) else None
+
+
+_OPS = {"==": "eq", "=": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge"}
+
+def _apply_filters(df, filters):
+    """The pyarrow-style [(column, op, value), ...] filters, on a frame already in memory."""
+    for col, op, val in filters or []:
+        if op == "in":
+            df = df[df[col].isin(list(val))]
+        elif op == "not in":
+            df = df[~df[col].isin(list(val))]
+        else:
+            df = df[getattr(df[col], _OPS[op])(val)]
+    return df
+
+def read_ranked(path, columns=None, filters=None):
+    """
+    Ranked cross-section from a Parquet snapshot or a legacy CSV export, reading
+    only `columns` and the rows matching `filters` ([(column, op, value), ...]
+    with ==, !=, <, <=, >, >=, in, not in; AND-ed). On Parquet the filters are
+    pushed down to the row groups.
+    """
+    if path.endswith(".csv"):
+        need = None if columns is None else list(dict.fromkeys(list(columns) + [c for c, _, _ in filters or []]))
+        df = _apply_filters(pd.read_csv(path, usecols=need), filters)
+        return (df if columns is None else df[list(columns)]).reset_index(drop=True)
+    return pd.read_parquet(path, columns=columns, filters=filters or None).reset_index(drop=True)
+
+def read_history(out_dir, start=None, end=None, columns=None, filters=None):
+    """Snapshots dated in [start, end] stacked into one frame with a leading `date` column."""
+    snaps = list_snapshots(out_dir)
+    if start is not None:
+        snaps = snaps[snaps.index >= pd.Timestamp(start)]
+    if end is not None:
+        snaps = snaps[snaps.index <= pd.Timestamp(end)]
+    parts = [read_ranked(p, columns, filters).assign(date=d) for d, p in snaps.items()]
+    if not parts:
+        return pd.DataFrame(columns=["date"] + list(columns or []))
+    df = pd.concat(parts, ignore_index=True)
+    return df[["date"] + [c for c in df.columns if c != "date"]]
@@ -1,7 +1,11 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from price_cache import PriceStore
+from risk import EwmaCov, sleeve_weights, rolling_sleeve_corr
+from significance import bootstrap, permutation_test, fmt_ci
+
 # ------------------------------
 # Value sleeve tickers
 # ------------------------------
@@ -113,22 +117,73 @@ SECTOR_MAP = {
 
 
 def fetch_prices(tickers, start_date, end_date):
-    """Download adjusted close prices for all tickers."""
-    raw_data = yf.download(tickers, start=start_date, end=end_date)
-
-    if len(tickers) == 1:
-        data = raw_data["Adj Close"].to_frame(name=tickers[0])
-    else:
-        if isinstance(raw_data.columns, pd.MultiIndex) and "Adj Close" in raw_data.columns.levels[0]:
-            data = raw_data["Adj Close"]
-        elif "Adj Close" in raw_data.columns:
-            data = raw_data[["Adj Close"]]
-        else:
-            data = raw_data["Close"]
-
+    """Adjusted close prices for all tickers, read through the local price cache."""
+    data = PriceStore().get(tickers, start_date, end_date)
     return data.ffill().dropna(how="all")
 
 
+def sleeve_sector_returns(daily_rets, sleeves, sector_map=SECTOR_MAP):
+    """
+    Equal-weight daily returns of every sleeve x sector bucket in one matrix multiply.
+
+    daily_rets: dates x tickers returns (DataFrame or PricePanel)
+    sleeves:    {sleeve name: [tickers]}
+    sector_map: ticker -> sector ("Other" if missing); None gives one bucket per sleeve
+
+    Tickers missing from daily_rets are ignored and NaN returns are skipped per
+    day, like DataFrame.mean(axis=1). Returns (daily frame with (sleeve, sector)
+    columns, ticker counts per bucket).
+    """
+    pos = {t: i for i, t in enumerate(daily_rets.columns)}
+    keys, rows, cols = {}, [], []
+    for name, ticks in sleeves.items():
+        for t in dict.fromkeys(ticks):
+            if t not in pos:
+                continue
+            key = (name, "All" if sector_map is None else sector_map.get(t, "Other"))
+            rows.append(pos[t])
+            cols.append(keys.setdefault(key, len(keys)))
+
+    members = np.zeros((len(pos), len(keys)))
+    members[rows, cols] = 1.0
+
+    r = np.asarray(daily_rets.to_numpy(), dtype="float64")
+    valid = ~np.isnan(r)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = (np.where(valid, r, 0.0) @ members) / (valid @ members)
+
+    columns = pd.MultiIndex.from_tuples(list(keys), names=["sleeve", "sector"])
+    counts = pd.Series(members.sum(axis=0).astype(int), index=columns, name="Num_Tickers")
+    return pd.DataFrame(daily, index=daily_rets.index, columns=columns), counts
+
+
+def plot_cumulative(curves, title, colors, figsize=(12, 6), linewidth=2.2, path=None, show=True):
+    """Slide-style cumulative return chart; `curves` maps legend label -> cumulative return Series."""
+    plt.rcParams['font.family'] = 'Palatino'
+
+    fig = plt.figure(figsize=figsize)
+    for (label, cum), color in zip(curves.items(), colors):
+        plt.plot(cum.index, cum, label=label, linewidth=linewidth, color=color)
+
+    ax = plt.gca()
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_visible(False)
+    ax.set_xticklabels([])
+    ax.set_xticks([])
+
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'{y:.0%}'))
+    plt.ylabel("Cumulative Return")
+    plt.legend(frameon=False, loc='best')
+    plt.grid(False)
+    plt.title(title)
+    if path:
+        fig.savefig(path, dpi=150, bbox_inches='tight', facecolor='white')
+    if show:
+        plt.show()
+    return fig
+
+
 if __name__ == "__main__":
     # 1) Fetch data
     all_tickers = list(set(VALUE_TICKERS + MOM_TICKERS))
@@ -139,16 +194,30 @@ if __name__ == "__main__":
     daily_rets = prices.pct_change().dropna()
 
     # 3) Equal-weight sleeve returns
-    value_rets = daily_rets[VALUE_TICKERS].mean(axis=1)
-    mom_rets   = daily_rets[MOM_TICKERS].mean(axis=1)
+    sleeves = {"Value": VALUE_TICKERS, "Momentum": MOM_TICKERS}
+    sleeve_rets, _ = sleeve_sector_returns(daily_rets, sleeves, sector_map=None)
+    value_rets = sleeve_rets[("Value", "All")]
+    mom_rets   = sleeve_rets[("Momentum", "All")]
 
     # 4) Total return over the period for each sleeve
     value_total = (1 + value_rets).prod() - 1
     mom_total   = (1 + mom_rets).prod() - 1
 
+    # Block-bootstrap intervals and permutation p-values for the sleeve figures below
+    pair = ("Momentum", "Value")
+    pair_rets = pd.DataFrame({"Value": value_rets, "Momentum": mom_rets})
+    boot = bootstrap(pair_rets, [pair])
+    perm = permutation_test(pair_rets, [pair])
+    gap = f"{pair[0]} - {pair[1]}"
+
     print("==== Sleeve Returns ({} to {}) ====".format(START_DATE, END_DATE))
-    print(f"Value sleeve total return:     {value_total:.2%}")
-    print(f"Momentum sleeve total return:  {mom_total:.2%}")
+    print(f"Value sleeve total return:     {value_total:.2%}  95% CI {fmt_ci(boot, 'Value', 'total_return')}")
+    print(f"Momentum sleeve total return:  {mom_total:.2%}  95% CI {fmt_ci(boot, 'Momentum', 'total_return')}")
+    print(f"Momentum - Value gap:          {mom_total - value_total:.2%}  95% CI "
+          f"{fmt_ci(boot, gap, 'diff_total_return')}, bootstrap p={boot.loc[(gap, 'diff_total_return'), 'p_value']:.3f}, "
+          f"permutation p={perm.loc[(gap, 'diff_mean'), 'p_value']:.3f}")
+    print(f"Momentum - Value Sharpe gap:   {boot.loc[(gap, 'diff_sharpe'), 'estimate']:.2f}  95% CI "
+          f"{fmt_ci(boot, gap, 'diff_sharpe', '.2f')}, permutation p={perm.loc[(gap, 'diff_sharpe'), 'p_value']:.3f}")
     
     # Volatility (Standard Deviation) analysis
     value_volatility = value_rets.std() * (252**0.5)  # Annualized volatility
@@ -158,8 +227,8 @@ if __name__ == "__main__":
     
     print(f"\nValue sleeve daily volatility:     {value_vol_daily:.4f} ({value_vol_daily:.2%})")
     print(f"Momentum sleeve daily volatility:  {mom_vol_daily:.4f} ({mom_vol_daily:.2%})")
-    print(f"Value sleeve annualized volatility:     {value_volatility:.2%}")
-    print(f"Momentum sleeve annualized volatility:  {mom_volatility:.2%}")
+    print(f"Value sleeve annualized volatility:     {value_volatility:.2%}  95% CI {fmt_ci(boot, 'Value', 'ann_vol')}")
+    print(f"Momentum sleeve annualized volatility:  {mom_volatility:.2%}  95% CI {fmt_ci(boot, 'Momentum', 'ann_vol')}")
 
     # 5) Correlation analysis
     corr_daily    = mom_rets.corr(value_rets)
@@ -167,93 +236,54 @@ if __name__ == "__main__":
     weekly_mom    = mom_rets.resample('W').sum()
     weekly_value  = value_rets.resample('W').sum()
     corr_weekly   = weekly_mom.corr(weekly_value)
-    rolling_corr_series = mom_rets.rolling(5).corr(value_rets)
+    w_mom   = sleeve_weights(daily_rets.columns, MOM_TICKERS)
+    w_value = sleeve_weights(daily_rets.columns, VALUE_TICKERS)
+    rolling_corr_series = rolling_sleeve_corr(daily_rets, w_mom, w_value, 5)
     rolling_corr = rolling_corr_series.median()
+    ewma = EwmaCov.from_returns(daily_rets)
+    corr_ewma = ewma.sleeve_corr(w_mom, w_value)
 
     print("\n==== Correlation Analysis ====")
-    print(f"Daily returns correlation (Pearson):  {corr_daily:.3f}")
+    print(f"Daily returns correlation (Pearson):  {corr_daily:.3f}  95% CI {fmt_ci(boot, gap, 'corr', '.3f')}, "
+          f"permutation p={perm.loc[(gap, 'corr'), 'p_value']:.3f}")
     print(f"Daily returns correlation (Spearman): {corr_spearman:.3f}")
     print(f"Weekly returns correlation:           {corr_weekly:.3f}")
     print(f"Median 5-day rolling correlation:     {rolling_corr:.3f}")
+    print(f"EWMA correlation (lambda={ewma.lam}):    {corr_ewma:.3f}")
 
     # 6) Cumulative return plot (for slides)
     value_cum = (1 + value_rets).cumprod() - 1
     mom_cum   = (1 + mom_rets).cumprod() - 1
 
-    plt.rcParams['font.family'] = 'Palatino'
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(value_cum.index, value_cum, label="Value Stocks", linewidth=2.2,
-             color=(30/255, 60/255, 96/255))
-    plt.plot(mom_cum.index, mom_cum, label="Momentum Stocks", linewidth=2.2,
-             color=(234/255, 51/255, 35/255))
-
-    ax = plt.gca()
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['bottom'].set_visible(False)
-    ax.set_xticklabels([])
-    ax.set_xticks([])
-
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'{y:.0%}'))
-    plt.ylabel("Cumulative Return")
-    plt.legend(frameon=False)
-    plt.grid(False)
-    plt.title("Momentum vs Value Stocks: Cumulative Returns (2025-10-06 to 2025-11-14)")
-    plt.show()
+    plot_cumulative(
+        {"Value Stocks": value_cum, "Momentum Stocks": mom_cum},
+        "Momentum vs Value Stocks: Cumulative Returns (2025-10-06 to 2025-11-14)",
+        colors=[(30/255, 60/255, 96/255), (234/255, 51/255, 35/255)])
 
     # 7) Sector-level performance inside each sleeve
     print("\n==== Sector Attribution (Equal-weight within sleeve) ====")
 
-    def sector_attribution(ticker_list, name):
-        # group tickers by sector
-        sector_to_tickers = {}
-        for t in ticker_list:
-            if t not in daily_rets.columns:
-                continue
-            sector = SECTOR_MAP.get(t, "Other")
-            sector_to_tickers.setdefault(sector, []).append(t)
-
-        rows = []
-        for sector, ticks in sector_to_tickers.items():
-            sector_ret_series = daily_rets[ticks].mean(axis=1)
-            total_ret = (1 + sector_ret_series).prod() - 1
-            rows.append((sector, len(ticks), total_ret))
+    sector_daily, sector_counts = sleeve_sector_returns(
+        daily_rets, {**sleeves, "All": all_tickers}, SECTOR_MAP)
+    sector_totals = (1 + sector_daily).prod() - 1
 
-        df = pd.DataFrame(rows, columns=["Sector", "Num_Tickers", "Total_Return"])
+    for name in sleeves:
+        df = pd.DataFrame({
+            "Sector": sector_totals[name].index,
+            "Num_Tickers": sector_counts[name].values,
+            "Total_Return": sector_totals[name].values,
+        })
         df = df.sort_values("Total_Return")
         print(f"\n{name} sleeve:")
         print(df.to_string(index=False))
-
-    sector_attribution(VALUE_TICKERS, "Value")
-    sector_attribution(MOM_TICKERS, "Momentum")
     
     # 8) Industry/Sector Performance Graph
     print("\n==== All Sector Performance Analysis ====")
     
-    # Calculate sector returns across all tickers
-    sector_returns = {}
-    sector_tickers_count = {}
-    
-    for ticker in all_tickers:
-        if ticker not in daily_rets.columns:
-            continue
-        sector = SECTOR_MAP.get(ticker, "Other")
-        if sector not in sector_returns:
-            sector_returns[sector] = []
-            sector_tickers_count[sector] = 0
-        sector_returns[sector].append(daily_rets[ticker])
-        sector_tickers_count[sector] += 1
-    
-    # Calculate equal-weighted sector performance
-    sector_performance = {}
-    sector_cumulative = {}
-    
-    for sector, returns_list in sector_returns.items():
-        if len(returns_list) >= 1:  # Include all sectors
-            sector_daily_returns = pd.concat(returns_list, axis=1).mean(axis=1)
-            sector_performance[sector] = sector_daily_returns
-            sector_cumulative[sector] = (1 + sector_daily_returns).cumprod() - 1
+    # Equal-weighted sector performance across all tickers
+    sector_performance = sector_daily["All"]
+    sector_cumulative = (1 + sector_performance).cumprod() - 1
+    sector_tickers_count = sector_counts["All"]
     
     # Get all sectors sorted by total return
     sector_total_returns = {sector: (1 + returns).prod() - 1 
@@ -266,30 +296,10 @@ if __name__ == "__main__":
         print(f"{i}. {sector}: {total_ret:.2%} ({ticker_count} stocks)")
     
     # Plot all sectors
-    plt.figure(figsize=(14, 8))
-    
-    # Color palette for all sectors - using a variety of colors
     import matplotlib.cm as cm
-    import numpy as np
     colors = cm.tab10(np.linspace(0, 1, len(all_sectors)))
-    
-    for i, (sector, _) in enumerate(all_sectors):
-        cum_returns = sector_cumulative[sector]
-        plt.plot(cum_returns.index, cum_returns, 
-                label=f"{sector} ({sector_tickers_count[sector]} stocks)", 
-                linewidth=2.0, color=colors[i])
-    
-    # Apply same styling as value/momentum graph
-    ax = plt.gca()
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['bottom'].set_visible(False)
-    ax.set_xticklabels([])
-    ax.set_xticks([])
-    
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f'{y:.0%}'))
-    plt.ylabel("Cumulative Return")
-    plt.legend(frameon=False, loc='best')
-    plt.grid(False)
-    plt.title("All Sector Performance: Cumulative Returns (2025-10-06 to 2025-11-14)")
-    plt.show()
+    plot_cumulative(
+        {f"{sector} ({sector_tickers_count[sector]} stocks)": sector_cumulative[sector]
+         for sector, _ in all_sectors},
+        "All Sector Performance: Cumulative Returns (2025-10-06 to 2025-11-14)",
+        colors=colors, figsize=(14, 8), linewidth=2.0)
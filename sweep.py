@@ -0,0 +1,139 @@
+import os, shutil, argparse, tempfile, itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from momentum import OUT_DIR, MIN_MONTHS, HISTORY_MONTHS, LOWER_PCT
+from backtest import START_DATE, monthly_prices, tail_backtest, summarize
+from ranking import group_labels
+from price_panel import PricePanel
+from instrument import RunStats
+from multi_universe import MAX_WORKERS, SHM_ROOT
+
+
+LOOKBACKS  = [3, 6, 9, 12]
+SKIPS      = [0, 1]
+MIN_MONTHS_GRID = [MIN_MONTHS]
+WINDOWS    = [HISTORY_MONTHS]       # trailing months the min-history rule is counted over
+CUTOFFS    = [LOWER_PCT, 0.20, 0.30]     # lower tail; the upper tail is 1 - lower
+RESULTS_FILE = "sweep_results.csv"       # under OUT_DIR
+
+
+def grid(lookbacks=LOOKBACKS, skips=SKIPS, min_months=MIN_MONTHS_GRID, windows=WINDOWS, cutoffs=CUTOFFS):
+    """Every (lookback, skip, window, min_months, lower, upper) point with skip < lookback, as a frame."""
+    rows = [(lb, sk, w, mm, lo, round(1.0 - lo, 10))
+            for lb, sk, w, mm, lo in itertools.product(lookbacks, skips, windows, min_months, cutoffs)
+            if sk < lb]
+    return pd.DataFrame(rows, columns=["lookback", "skip", "window", "min_months", "lower", "upper"])
+
+
+# --- worker side: the log month-end panel is memory-mapped once per process
+
+_LOG = _SEEN = _FWD = _INDEX = _GROUPS = None
+
+def _attach(root, group_by=None):
+    """Map the shared log-price panel and derive the per-process arrays every grid point reuses."""
+    global _LOG, _SEEN, _FWD, _INDEX, _GROUPS
+    panel = PricePanel.load(root, mmap=True)
+    _LOG, _INDEX = panel.values, panel.dates
+    _SEEN = np.zeros((len(_LOG) + 1, _LOG.shape[1]), dtype=np.int64)
+    np.cumsum(~np.isnan(_LOG), axis=0, out=_SEEN[1:])
+    _FWD = np.full(_LOG.shape, np.nan)
+    _FWD[:-1] = np.expm1(_LOG[1:] - _LOG[:-1])
+    _GROUPS = group_labels(panel.tickers, group_by)
+
+def _signal(lookback, skip, window, min_months):
+    """momentum_signal + eligible off the shared log prices: one subtraction per month, no rolling."""
+    sig = np.full(_LOG.shape, np.nan)
+    t = np.arange(lookback, len(_LOG))
+    full = (_SEEN[t - skip + 1] - _SEEN[t - lookback]) == lookback - skip + 1
+    sig[t] = np.where(full, np.expm1(_LOG[t - skip] - _LOG[t - lookback]), np.nan)
+    lo = np.maximum(np.arange(1, len(_SEEN)) - window, 0)
+    ok = (_SEEN[1:] - _SEEN[lo]) >= min_months
+    return np.where(ok, sig, np.nan)
+
+def _evaluate(lookback, skip, window, min_months, cutoffs):
+    """Summaries for one signal at each (lower, upper) cutoff."""
+    sig = _signal(lookback, skip, window, min_months)
+    rows = []
+    for lower, upper in cutoffs:
+        s = summarize(tail_backtest(sig, _FWD, _INDEX, lower, upper, _GROUPS))
+        rows.append({"lookback": lookback, "skip": skip, "window": window, "min_months": min_months,
+                     "lower": lower, "upper": upper, **s.to_dict()})
+    return rows
+
+
+def run(prices_m, points=None, max_workers=MAX_WORKERS, group_by=None, stats=None):
+    """
+    Backtest every grid point off one month-end panel. Log prices are taken
+    once and written to a RAM-backed temp dir that every worker memory-maps;
+    each (lookback, skip, window, min_months) signal is one difference of those
+    logs and is built once for all of its cutoffs. Tasks are spread over a
+    process pool. Returns one tidy row per point with the backtest.summarize
+    columns.
+    """
+    points = grid() if points is None else points
+    stats = stats or RunStats(mode="sweep")
+    keys = ["lookback", "skip", "window", "min_months"]
+    jobs = [(*k, list(zip(g["lower"], g["upper"]))) for k, g in points.groupby(keys, sort=False)]
+
+    with stats.stage("log_prices", prices_m) as st:
+        p = prices_m.to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logp = np.log(np.where(p > 0, p, np.nan))
+        panel = PricePanel(logp, prices_m.index, prices_m.columns)
+        st["out"] = panel
+
+    root = tempfile.mkdtemp(prefix="momentum_sweep_", dir=SHM_ROOT)
+    try:
+        panel.save(root)
+        del panel, logp
+        with stats.stage("sweep") as st:
+            if max_workers <= 1:
+                _attach(root, group_by)
+                results = [_evaluate(*j) for j in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)),
+                                         initializer=_attach, initargs=(root, group_by)) as pool:
+                    results = list(pool.map(_evaluate, *zip(*jobs)))
+            st.update(points=len(points), signals=len(jobs))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return pd.DataFrame([r for rows in results for r in rows])
+
+
+def _ints(s):
+    return [int(x) for x in s.split(",") if x]
+
+def _floats(s):
+    return [float(x) for x in s.split(",") if x]
+
+def main():
+    ap = argparse.ArgumentParser(description="Grid of formation windows, skips, history rules and tail cutoffs.")
+    ap.add_argument("--lookbacks", type=_ints, default=LOOKBACKS, help="comma-separated months, e.g. 3,6,9,12")
+    ap.add_argument("--skips", type=_ints, default=SKIPS)
+    ap.add_argument("--min-months", type=_ints, default=MIN_MONTHS_GRID)
+    ap.add_argument("--windows", type=_ints, default=WINDOWS, help="months the min-history rule is counted over")
+    ap.add_argument("--cutoffs", type=_floats, default=CUTOFFS, help="lower tails; upper = 1 - lower")
+    ap.add_argument("--group-by", choices=["exchange", "country"], default=None)
+    ap.add_argument("--start", default=START_DATE)
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = ap.parse_args()
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    stats = RunStats(mode="sweep")
+    try:
+        with stats.stage("load") as st:
+            prices_m = monthly_prices(args.start)
+            st["out"] = prices_m
+        points = grid(args.lookbacks, args.skips, args.min_months, args.windows, args.cutoffs)
+        res = run(prices_m, points, args.workers, args.group_by, stats)
+    finally:
+        stats.write(os.path.join(OUT_DIR, "run_stats_sweep.json"))
+    res.to_csv(os.path.join(OUT_DIR, RESULTS_FILE), index=False)
+    with pd.option_context("display.width", 160, "display.max_rows", None):
+        print(res.sort_values("sharpe", ascending=False).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+if __name__ == "__main__":
+    main()
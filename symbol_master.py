@@ -0,0 +1,242 @@
+import os, sqlite3
+import pandas as pd
+
+from price_cache import CACHE_DIR
+from ranking import exchange_groups
+from to_yf_us_can import SUFFIX_MAP, norm_exchange
+
+
+MASTER_PATH    = os.path.join(CACHE_DIR, "symbols.sqlite")
+DEAD_TTL_DAYS  = 30       # a ticker that returned no data is skipped for this long, then retried
+DEAD_MISSES    = 2        # empty answers on separate days before a ticker counts as dead
+MAX_DEAD_SHARE = 0.5      # more empties than this in one download looks like an outage, not dead names
+SEED_FROM      = "1900-01-01"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exchanges (
+    name   TEXT PRIMARY KEY,            -- normalised screener exchange name
+    suffix TEXT NOT NULL                -- Yahoo suffix ('' for US)
+);
+CREATE TABLE IF NOT EXISTS overrides (
+    original   TEXT NOT NULL,           -- upper-cased, spaces removed
+    yahoo      TEXT NOT NULL,
+    valid_from TEXT NOT NULL,
+    valid_to   TEXT,                    -- exclusive; NULL = open
+    source     TEXT NOT NULL,
+    PRIMARY KEY (original, valid_from)
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    original   TEXT NOT NULL,           -- as it appeared in the screener / universe file
+    exchange   TEXT NOT NULL,
+    yahoo      TEXT NOT NULL,
+    valid_from TEXT NOT NULL,
+    valid_to   TEXT,                    -- exclusive; NULL = still current
+    PRIMARY KEY (original, valid_from)
+);
+CREATE INDEX IF NOT EXISTS symbols_yahoo ON symbols (yahoo);
+CREATE INDEX IF NOT EXISTS symbols_open ON symbols (original) WHERE valid_to IS NULL;
+CREATE TABLE IF NOT EXISTS dead (
+    yahoo       TEXT PRIMARY KEY,
+    first_empty TEXT NOT NULL,
+    last_empty  TEXT NOT NULL,
+    misses      INTEGER NOT NULL
+);
+"""
+
+
+def _day(when=None):
+    return f"{pd.Timestamp(when if when is not None else pd.Timestamp.today()):%Y-%m-%d}"
+
+def _key(s):
+    return "".join(s.split()).upper() if isinstance(s, str) else s
+
+
+class SymbolMaster:
+    """
+    One SQLite store for everything that turns a screener symbol into a Yahoo
+    ticker: exchange name -> suffix (seeded from to_yf_us_can.SUFFIX_MAP),
+    explicit symbol overrides with validity dates (seeded from
+    momentum.CORRECTIONS, re-synced on every open), and the resolved original -> exchange -> Yahoo
+    history, where a changed mapping closes the old row and opens a new one.
+    The regex rules in momentum.sanitize stay the fallback for everything
+    without an override.
+
+    It also keeps a negative cache of tickers that came back with no data:
+    once they have done so on DEAD_MISSES separate days they are skipped by
+    downloads until DEAD_TTL_DAYS after the last empty answer, and they are
+    dropped from it as soon as they return data again.
+    """
+
+    def __init__(self, path=None, dead_ttl_days=DEAD_TTL_DAYS, dead_misses=DEAD_MISSES):
+        self.path = path or MASTER_PATH
+        self.dead_ttl_days = dead_ttl_days
+        self.dead_misses = dead_misses
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(_SCHEMA)
+        self._seed()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _seed(self):
+        from momentum import CORRECTIONS
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO exchanges VALUES (?, ?)",
+                                [(norm_exchange(k), v) for k, v in SUFFIX_MAP.items()])
+            # the seeded rows follow momentum.CORRECTIONS on every open; manual overrides are left alone
+            self.db.executemany("""
+                INSERT INTO overrides VALUES (?, ?, ?, NULL, 'corrections')
+                ON CONFLICT (original, valid_from) DO UPDATE SET yahoo = excluded.yahoo
+                WHERE source = 'corrections'""", [(_key(k), v, SEED_FROM) for k, v in CORRECTIONS.items()])
+            keep = [_key(k) for k in CORRECTIONS]
+            self.db.execute(f"DELETE FROM overrides WHERE source = 'corrections' AND original NOT IN "
+                            f"({','.join('?' * len(keep))})", keep)
+
+    # --- mappings
+    def _exchanges(self):
+        """The exchange table as (name -> suffix, rows longest name first), for exchange_suffix."""
+        rows = self.db.execute("SELECT name, suffix FROM exchanges").fetchall()
+        return dict(rows), sorted(rows, key=lambda r: (-len(r[0]), r[0]))
+
+    def exchange_suffix(self, exchange, table=None):
+        """
+        Yahoo suffix for an exchange name: exact match first, then the longest
+        contained name ('' if none). Pass `table` (from _exchanges) to look up
+        many names off one read of the table.
+        """
+        ex = norm_exchange(exchange)
+        exact, by_length = table or self._exchanges()
+        if ex in exact:
+            return exact[ex]
+        for name, suffix in by_length:
+            if name in ex:
+                return suffix
+        return ""
+
+    def add_exchange(self, name, suffix):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO exchanges VALUES (?, ?)", (norm_exchange(name), suffix))
+
+    def add_override(self, original, yahoo, valid_from=None, source="manual"):
+        """Map `original` to `yahoo` from `valid_from` (today) on, closing any override open at that date."""
+        key, start = _key(original), _day(valid_from)
+        with self.db:
+            self.db.execute("UPDATE overrides SET valid_to = ? WHERE original = ? AND valid_to IS NULL "
+                            "AND valid_from < ?", (start, key, start))
+            self.db.execute("INSERT OR REPLACE INTO overrides VALUES (?, ?, ?, NULL, ?)", (key, yahoo, start, source))
+
+    def overrides(self, on=None):
+        """original -> yahoo for the overrides valid on `on` (today)."""
+        day = _day(on)
+        rows = self.db.execute("SELECT original, yahoo FROM overrides WHERE valid_from <= ? "
+                               "AND (valid_to IS NULL OR valid_to > ?) ORDER BY valid_from", (day, day))
+        return dict(rows.fetchall())
+
+    def resolve(self, raw, allowed=None, on=None, record=True):
+        """
+        Drop-in for momentum.sanitize_many that goes through the master:
+        'Exchange:Symbol' strings take the exchange's suffix, then the overrides
+        valid on `on` apply, then the sanitize rules without momentum.CORRECTIONS
+        (those are seeded overrides here, so a dated override can replace one).
+        With `record` the resulting original -> exchange -> Yahoo rows are
+        stored. Returns (clean Series aligned with `raw`, rejects frame), like
+        sanitize_many.
+        """
+        from momentum import sanitize_many, ALLOWED_SUFFIXES
+        allowed = ALLOWED_SUFFIXES if allowed is None else allowed
+        raw = pd.Series(raw, dtype=object)
+        uniq = pd.unique(raw)
+        fixed = self.overrides(on)
+        table = self._exchanges()
+        venue, mapped = {}, {}
+        for u in uniq:
+            s = u
+            if isinstance(u, str) and ":" in u:
+                ex, sym = u.split(":", 1)
+                venue[u] = norm_exchange(ex)
+                s = sym.strip() + self.exchange_suffix(ex, table)
+            k = _key(s)
+            mapped[u] = fixed.get(k, s)
+        clean, rejects = sanitize_many(pd.Series([mapped[u] for u in uniq], dtype=object), allowed, corrections={})
+        resolved = dict(zip(uniq, clean))
+        if record:
+            good = [u for u in uniq if isinstance(u, str) and resolved[u]]
+            labels = exchange_groups([resolved[u] for u in good]) if good else []
+            self._record([(u, venue.get(u, lab), resolved[u]) for u, lab in zip(good, labels)], on)
+        back = {}
+        for u in uniq:
+            back.setdefault(mapped[u], u)
+        rejects["symbol"] = rejects["symbol"].map(lambda s: back.get(s, s))
+        return raw.map(resolved), rejects
+
+    def _record(self, rows, on=None):
+        """Store (original, exchange, yahoo) rows; a mapping that changed closes the open row first."""
+        if not rows:
+            return
+        day = _day(on)
+        with self.db:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (original TEXT, exchange TEXT, yahoo TEXT)")
+            self.db.execute("DELETE FROM incoming")
+            self.db.executemany("INSERT INTO incoming VALUES (?, ?, ?)", rows)
+            self.db.execute("""
+                UPDATE symbols SET valid_to = ?
+                WHERE valid_to IS NULL AND valid_from < ? AND EXISTS (
+                    SELECT 1 FROM incoming i WHERE i.original = symbols.original
+                    AND (i.yahoo != symbols.yahoo OR i.exchange != symbols.exchange))""", (day, day))
+            self.db.execute("""
+                INSERT OR REPLACE INTO symbols
+                SELECT i.original, i.exchange, i.yahoo, ?, NULL FROM incoming i
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM symbols s WHERE s.original = i.original AND s.valid_to IS NULL
+                    AND s.yahoo = i.yahoo AND s.exchange = i.exchange)""", (day,))
+
+    def history(self, ticker=None, original=None):
+        """Stored mapping rows for a Yahoo ticker or an original symbol (all rows if neither is given)."""
+        sql, args = "SELECT * FROM symbols", ()
+        if ticker is not None:
+            sql, args = sql + " WHERE yahoo = ?", (ticker,)
+        elif original is not None:
+            sql, args = sql + " WHERE original = ?", (original,)
+        return pd.read_sql_query(sql + " ORDER BY original, valid_from", self.db, params=args)
+
+    # --- negative cache
+    def dead(self, on=None):
+        """Tickers empty on at least `dead_misses` separate days, the last less than the TTL before `on` (today)."""
+        cutoff = _day(pd.Timestamp(_day(on)) - pd.Timedelta(days=self.dead_ttl_days))
+        rows = self.db.execute("SELECT yahoo FROM dead WHERE last_empty > ? AND misses >= ?", (cutoff, self.dead_misses))
+        return {t for (t,) in rows}
+
+    def split_live(self, tickers, on=None):
+        """(tickers to download, tickers skipped as known dead), both in input order."""
+        dead = self.dead(on)
+        return [t for t in tickers if t not in dead], [t for t in tickers if t in dead]
+
+    def record_download(self, requested, with_data, failed=(), on=None):
+        """
+        Update the negative cache after a download: `requested` names without
+        data (and not in `failed`, which errored rather than came back empty)
+        get a miss, at most one per day; names in `with_data` are cleared.
+        Nothing is marked when more than MAX_DEAD_SHARE of the request came
+        back empty, since that is an outage rather than dead symbols. Returns
+        the names marked.
+        """
+        with_data, failed = set(with_data), set(failed)
+        empty = [t for t in requested if t not in with_data and t not in failed]
+        if requested and len(empty) > MAX_DEAD_SHARE * len(requested):
+            empty = []
+        day = _day(on)
+        with self.db:
+            self.db.executemany("DELETE FROM dead WHERE yahoo = ?", [(t,) for t in with_data])
+            self.db.executemany("""
+                INSERT INTO dead VALUES (?, ?, ?, 1)
+                ON CONFLICT (yahoo) DO UPDATE SET last_empty = max(last_empty, excluded.last_empty),
+                    misses = misses + (excluded.last_empty > last_empty)""",
+                [(t, day, day) for t in empty])
+        return empty
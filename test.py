@@ -1,40 +1,102 @@
-import yfinance as yf
+import os, argparse
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 
-def calc_12_1m_return(ticker: str):
+from momentum import OUT_DIR, daily_closes, window_start, to_month_end, compute_mom_12_1
+from symbol_master import SymbolMaster
+from snapshots import latest_snapshot, read_ranked
+
+TOL = 1e-9      # relative; both paths read the same cached closes, so anything above this is a real difference
+
+
+def positional_12_1(prices_m):
     """
-    Calculate the 12-1 month momentum return for a given ticker.
-    Definition: (Price_1M_Ago / Price_12M_Ago) - 1
+    The original spot-check definition, per column: monthly.iloc[-2] / iloc[-13] - 1
+    on each ticker's own month-ends, from its first to its last month with data
+    (gaps inside stay NaN). NaN when a ticker spans fewer than 13 months.
     """
-    end_date = datetime.today()
-    start_date = end_date - timedelta(days=550)  # ~18 months for buffer
+    p = prices_m.to_numpy(dtype="float64")
+    valid = ~np.isnan(p)
+    has = valid.any(axis=0)
+    first = valid.argmax(axis=0)
+    last = len(p) - 1 - valid[::-1].argmax(axis=0)
+    ok = has & (last - first + 1 >= 13)
+    cols = np.arange(p.shape[1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mom = p[np.maximum(last - 1, 0), cols] / p[np.maximum(last - 12, 0), cols] - 1.0
+    return pd.Series(np.where(ok, mom, np.nan), index=prices_m.columns, name="mom_positional")
 
-    # Download daily data
-    data = yf.download(ticker, start=start_date, end=end_date, progress=False)
+def spot_check(tickers, ranked_path=None, start=None, tol=TOL):
+    """
+    12-1 spot check for many tickers from one shared fetch (through the cache).
+    Returns one row per ticker with the positional definition, compute_mom_12_1
+    on the calendar month-ends, and the latest ranked snapshot's value (or
+    `ranked_path`, a snapshot or CSV export), plus a `flag`
+    naming the first disagreement ("" when all agree).
+    """
+    raw = [t for t in tickers if isinstance(t, str)]
+    with SymbolMaster() as master:
+        clean, _ = master.resolve(raw, record=False)
+    tickers = sorted({c or t.strip().upper() for t, c in zip(raw, clean)})
+    close, _ = daily_closes(tickers, start or window_start())
+    prices_m = to_month_end(close.reindex(columns=tickers))
 
-    if data.empty:
-        raise ValueError(f"No data found for {ticker}")
+    out = pd.DataFrame({"mom_positional": positional_12_1(prices_m),
+                        "mom_12_1": compute_mom_12_1(prices_m)})
+    out["last_month"] = [prices_m[t].last_valid_index() for t in out.index]
 
-    # Resample to monthly frequency, take last close of each month
-    monthly = data['Adj Close'].resample('M').last()
+    ranked_path = ranked_path or latest_snapshot(OUT_DIR)
+    if ranked_path and os.path.exists(ranked_path):
+        ranked = read_ranked(ranked_path, ["ticker", "mom_12_1", "rank", "pct_rank"],
+                             [("ticker", "in", list(out.index))]).set_index("ticker")
+        out = out.join(ranked.rename(columns={"mom_12_1": "mom_ranked"}))
+    else:
+        out["mom_ranked"] = out["rank"] = out["pct_rank"] = np.nan
 
-    # Ensure we have at least 13 months of data
-    if len(monthly) < 13:
-        raise ValueError(f"Not enough data for {ticker}")
+    def differs(a, b):
+        with np.errstate(invalid="ignore"):
+            close_enough = np.isclose(out[a], out[b], rtol=tol, atol=0.0)
+        return ~close_enough & ~(out[a].isna() & out[b].isna())
 
-    price_1m_ago = monthly.iloc[-2]     # price 1 month ago
-    price_12m_ago = monthly.iloc[-13]   # price 12 months ago
+    out["flag"] = ""
+    no_data = out["last_month"].isna()
+    out.loc[differs("mom_12_1", "mom_ranked") & out["mom_ranked"].notna(), "flag"] = "snapshot differs"
+    out.loc[out["mom_ranked"].isna() & out["mom_12_1"].notna(), "flag"] = "not ranked"
+    out.loc[differs("mom_positional", "mom_12_1"), "flag"] = "definitions differ"
+    out.loc[no_data, "flag"] = "no data"
+    out.index.name = "ticker"
+    return out
 
-    momentum = (price_1m_ago / price_12m_ago - 1) * 100  # percent return
+def calc_12_1m_return(ticker: str):
+    """
+    Calculate the 12-1 month momentum return for a given ticker.
+    Definition: (Price_1M_Ago / Price_12M_Ago) - 1
+    """
+    row = spot_check([ticker]).iloc[0]
+    if row["flag"] == "no data":
+        raise ValueError(f"No data found for {ticker}")
+    if np.isnan(row["mom_positional"]):
+        raise ValueError(f"Not enough data for {ticker}")
+
+    momentum = row["mom_positional"] * 100  # percent return
 
     print(f"{ticker}: 12-1M return = {momentum:.2f}%")
     return momentum
 
 # Example usage:
 if __name__ == "__main__":
-    for t in ["RNMBY"]:
-        try:
-            calc_12_1m_return(t)
-        except Exception as e:
-            print(f"Error for {t}: {e}")
+    ap = argparse.ArgumentParser(description="Batch 12-1 spot check against the ranked snapshot.")
+    ap.add_argument("tickers", nargs="*", default=["RNMBY"])
+    ap.add_argument("--file", help="text/CSV file with one ticker per line (first column)")
+    ap.add_argument("--ranked", default=None, help="snapshot .parquet or ranked CSV (default: newest snapshot)")
+    ap.add_argument("--tol", type=float, default=TOL)
+    args = ap.parse_args()
+
+    tickers = list(args.tickers)
+    if args.file:
+        tickers += pd.read_csv(args.file, header=None, usecols=[0])[0].astype(str).tolist()
+    res = spot_check(tickers, args.ranked, tol=args.tol)
+    with pd.option_context("display.max_rows", None, "display.width", 160):
+        print(res.to_string(float_format=lambda x: f"{x:.6f}"))
+    bad = res[res["flag"] != ""]
+    print(f"\n{len(res)} tickers, {len(bad)} flagged: {bad['flag'].value_counts().to_dict()}")
@@ -0,0 +1,88 @@
+import csv, os, re
+from functools import lru_cache
+
+INPUT_PATH = r'C:\Users\rfang\Documents\RSM336\Company Screening Report.csv'
+FOLDER = os.path.dirname(INPUT_PATH)
+OUTPUT_PATH = os.path.join(FOLDER, 'yf_us_can.csv')
+OUTPUT_TXT_PATH = os.path.join(FOLDER, 'yf_us_can.txt')
+
+SUFFIX_MAP = {
+    "NASDAQGS": "", "NASDAQGM": "", "NASDAQCM": "", "NASDAQ": "",
+    "NYSE": "", "ARCA": "", "NYSEARCA": "", "NYSE AMERICAN": "",
+    "AMEX": "", "CBOE": "", "BATS": "", "NEW YORK STOCK EXCHANGE": "",
+    "NASDAQ GLOBAL SELECT": "", "NASDAQ GLOBAL MARKET": "", "NASDAQ CAPITAL MARKET": "",
+    # Canada
+    "TSX": ".TO", "TORONTO STOCK EXCHANGE": ".TO", "XTSE": ".TO",
+    "TSXV": ".V", "TSX VENTURE": ".V", "TSX VENTURE EXCHANGE": ".V", "CVE": ".V",
+    "NEO": ".NE", "NEO EXCHANGE": ".NE",
+}
+
+def norm_exchange(x: str) -> str:
+    x = (x or '').strip().upper()
+    return re.sub(r'\s+', ' ', x)
+
+# Exact names hit the hash; anything else gets one substring pass, longest key
+# first, so "TSX VENTURE EXCHANGE" never falls through to "TSX" whatever the dict order.
+_EXACT = {norm_exchange(k): v for k, v in SUFFIX_MAP.items()}
+_FALLBACK = sorted(_EXACT.items(), key=lambda kv: (-len(kv[0]), kv[0]))
+
+@lru_cache(maxsize=None)
+def exchange_suffix(ex: str) -> str:
+    """Yahoo suffix for an exchange name ('' for US and unknown venues)."""
+    ex_norm = norm_exchange(ex)
+    suf = _EXACT.get(ex_norm)
+    if suf is not None:
+        return suf
+    for key, suf in _FALLBACK:
+        if key in ex_norm:
+            return suf
+    return ''
+
+def to_yahoo(val: str) -> tuple[str, str]:
+    """
+    Convert 'Exchange:Symbol' -> (ticker, original)
+    Returns (ticker, original_string)
+    """
+    original = val.strip()
+    if ':' not in original:
+        return original.upper(), original
+
+    ex, sym = [p.strip() for p in original.split(':', 1)]
+    return f"{sym.upper()}{exchange_suffix(ex)}", original
+
+def iter_symbols(path):
+    """First non-empty cell of each row of a screening export, streamed."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for r in csv.reader(f):
+            if r and r[0].strip():
+                yield r[0].strip()
+
+def convert(input_path=INPUT_PATH, output_path=OUTPUT_PATH, output_txt_path=OUTPUT_TXT_PATH):
+    """
+    Stream a screening export into the Yahoo ticker CSV and TXT lists, one row
+    at a time. Only the set of tickers already written is kept in memory.
+    Returns (inputs read, unique tickers written).
+    """
+    seen = set()
+    n_in = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as fc, \
+         open(output_txt_path, 'w', encoding='utf-8') as ft:
+        w = csv.DictWriter(fc, fieldnames=['ticker', 'original'])
+        w.writeheader()
+        for raw in iter_symbols(input_path):
+            n_in += 1
+            ticker, original = to_yahoo(raw)
+            if ticker and ticker not in seen:
+                seen.add(ticker)
+                w.writerow({"ticker": ticker, "original": original})
+                ft.write(ticker + '\n')
+    return n_in, len(seen)
+
+def main():
+    n_in, n_out = convert(INPUT_PATH, OUTPUT_PATH, OUTPUT_TXT_PATH)
+    print(f"Converted {n_in} inputs -> {n_out} unique Yahoo tickers.")
+    print(f"Wrote: {OUTPUT_PATH}")
+    print(f"Wrote: {OUTPUT_TXT_PATH}")
+
+if __name__ == "__main__":
+    main()